@@ -17,6 +17,9 @@ class Settings(BaseSettings):
     DB_USER: str = "root"
     DB_PASSWORD: str = ""
     DB_NAME: str = "fluentai"
+    DB_POOL_SIZE: int = 10  # mysql-connector caps pools at 32
+    DB_POOL_RESET_SESSION: bool = False  # No handler sets session state
+    DB_POOL_TIMEOUT: float = 10.0  # Seconds a worker thread waits for a free pooled connection
     
     # JWT Settings
     JWT_SECRET_KEY: str = "fluentai-super-secret-key-change-in-production-2024"
@@ -26,6 +29,12 @@ class Settings(BaseSettings):
     # Encryption for API keys
     ENCRYPTION_KEY: str = "fluentai-encryption-key-32bytes!---"
     
+    # Synthesised speech, stored by content hash and served as immutable files.
+    # Defaults to backend/tts_audio regardless of the working directory; the
+    # oldest files are removed once the directory holds more than the cap
+    TTS_AUDIO_DIR: str = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tts_audio")
+    TTS_AUDIO_MAX_FILES: int = 5000
+    
     # CORS
     CORS_ORIGINS: list = ["http://localhost", "http://127.0.0.1", "http://localhost:80"]
     
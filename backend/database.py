@@ -2,9 +2,11 @@
 FluentAI Database Connection - MySQL with XAMPP
 """
 import mysql.connector
-from mysql.connector import pooling
+from mysql.connector import pooling, errors
 from config import settings
 from contextlib import contextmanager
+import asyncio
+import threading
 import logging
 
 logging.basicConfig(level=logging.INFO)
@@ -22,12 +24,32 @@ db_config = {
     "autocommit": False
 }
 
+POOL_SIZE = min(settings.DB_POOL_SIZE, pooling.CNX_POOL_MAXSIZE)
+
+# The pool opens all of its connections up front and raises PoolError at once
+# when they are all checked out; this semaphore makes worker-thread callers
+# queue for a free connection (up to DB_POOL_TIMEOUT) instead of failing under
+# load. Callers on the event loop thread (async def handlers) never wait - a
+# blocking wait there would freeze every request - and fail fast as before.
+_pool_slots = threading.BoundedSemaphore(POOL_SIZE)
+
+
+def _on_event_loop() -> bool:
+    """True when called from the thread running the asyncio event loop"""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
 # Create connection pool
 try:
     connection_pool = pooling.MySQLConnectionPool(
         pool_name="lingualearn_pool",
-        pool_size=10,
-        pool_reset_session=True,
+        pool_size=POOL_SIZE,
+        # Resetting costs a COM_RESET_CONNECTION round trip on every checkout;
+        # get_db_connection always commits or rolls back before returning
+        pool_reset_session=settings.DB_POOL_RESET_SESSION,
         **db_config
     )
     logger.info("Database connection pool created successfully")
@@ -39,6 +61,13 @@ except Exception as e:
 @contextmanager
 def get_db_connection():
     """Get a database connection from the pool"""
+    if _on_event_loop():
+        acquired = _pool_slots.acquire(blocking=False)
+    else:
+        acquired = _pool_slots.acquire(timeout=settings.DB_POOL_TIMEOUT)
+    if not acquired:
+        logger.error("Database error: no pooled connection available")
+        raise errors.PoolError("No pooled connection available")
     connection = None
     try:
         connection = connection_pool.get_connection()
@@ -52,6 +81,7 @@ def get_db_connection():
     finally:
         if connection:
             connection.close()
+        _pool_slots.release()
 
 
 @contextmanager
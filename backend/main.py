@@ -3,6 +3,7 @@ FluentAI - AI-Powered Language Learning Platform
 Main FastAPI Application Entry Point
 """
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from contextlib import asynccontextmanager
@@ -36,7 +37,8 @@ app = FastAPI(
     title=settings.APP_NAME,
     description="AI-Powered Adaptive Language Learning Platform",
     version=settings.APP_VERSION,
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # CORS Middleware
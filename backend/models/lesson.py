@@ -123,3 +123,4 @@ class LessonResult(BaseModel):
     new_level: Optional[str] = None
     mistakes: List[Dict[str, Any]] = []
     new_achievements: List[str] = []
+    access_token: Optional[str] = None  # Re-issued when the level claim changes
@@ -86,8 +86,8 @@ async def get_admin_stats(current_user: dict = Depends(get_admin_user)):
                     """SELECT COUNT(*) as lessons, 
                               COUNT(DISTINCT user_id) as users
                        FROM user_progress 
-                       WHERE DATE(completed_at) = %s""",
-                    (day_date,)
+                       WHERE completed_at >= %s AND completed_at < %s + INTERVAL 1 DAY""",
+                    (day_date, day_date)
                 )
                 day_stats = cursor.fetchone()
                 daily_activity.append({
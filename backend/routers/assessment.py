@@ -7,14 +7,20 @@ from datetime import datetime
 import json
 import logging
 
-from utils.jwt_handler import get_current_user
+from utils.jwt_handler import get_current_user, refresh_access_token
+from utils.cache import invalidate_user
 from database import get_db_cursor
 from services.ai_engine import AIAdaptiveEngine
+from services.skill_stats_service import SkillStatsService
+from services.dashboard_summary_service import DashboardSummaryService
 from models.lesson import LessonResult, AnswerSubmission
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+LEVEL_ORDER = ["A1", "A2", "B1", "B2", "C1", "C2"]
+LEVEL_INDEX = {level: i for i, level in enumerate(LEVEL_ORDER)}
+
 
 @router.get("/placement")
 async def get_placement_test(current_user: dict = Depends(get_current_user)):
@@ -161,17 +167,20 @@ async def submit_placement_test(
             )
             
             # Store assessment results
+            score = int((total_correct / len(answers)) * 100) if answers else 0
             cursor.execute(
                 """INSERT INTO user_progress 
                    (user_id, lesson_id, score, xp_earned, answers, completed_at, time_spent_seconds)
                    VALUES (%s, 0, %s, 0, %s, %s, 0)""",
                 (
                     current_user["user_id"],
-                    int((total_correct / len(answers)) * 100) if answers else 0,
+                    score,
                     json.dumps(results),
                     datetime.now()
                 )
             )
+            SkillStatsService.record_answers(cursor, current_user["user_id"], results)
+            DashboardSummaryService.record_progress(cursor, current_user["user_id"], 0, score)
 
             # Save mistakes for review
             for res in results:
@@ -203,15 +212,18 @@ async def submit_placement_test(
                     "total": stats["total"]
                 })
 
-            return {
+            result = {
                 "success": True,
                 "assigned_level": cefr_level,
                 "total_questions": len(answers),
                 "correct_answers": total_correct,
                 "score_percentage": round((total_correct / len(answers)) * 100, 1) if answers else 0,
                 "skill_breakdown": skill_breakdown,
-                "message": f"Congratulations! You've been placed at {cefr_level} level."
+                "message": f"Congratulations! You've been placed at {cefr_level} level.",
+                "access_token": refresh_access_token(current_user, cefr_level=cefr_level)
             }
+        invalidate_user(current_user["user_id"])
+        return result
     except Exception as e:
         logger.error(f"Submit placement test error: {e}")
         # Return specific error for debugging
@@ -226,8 +238,7 @@ async def get_transition_test(
     """
     Get transition test for level advancement
     """
-    valid_levels = ["A1", "A2", "B1", "B2", "C1", "C2"]
-    if target_level.upper() not in valid_levels:
+    if target_level.upper() not in LEVEL_INDEX:
         raise HTTPException(status_code=400, detail="Invalid target level")
     
     try:
@@ -239,8 +250,8 @@ async def get_transition_test(
             )
             user = cursor.fetchone()
             
-            current_index = valid_levels.index(user["cefr_level"]) if user["cefr_level"] else 0
-            target_index = valid_levels.index(target_level.upper())
+            current_index = LEVEL_INDEX.get(user["cefr_level"], 0)
+            target_index = LEVEL_INDEX[target_level.upper()]
             
             if target_index <= current_index:
                 raise HTTPException(
@@ -398,6 +409,6 @@ def _get_sample_transition_questions(level: str) -> List[Dict[str, Any]]:
     """Return sample transition test questions for a specific level"""
     # Return questions appropriate for the target level
     base_questions = _get_sample_placement_questions()
-    level_index = ["A1", "A2", "B1", "B2", "C1", "C2"].index(level)
+    level_index = LEVEL_INDEX.get(level, 0)
     min_difficulty = max(1, level_index)
     return [q for q in base_questions if q.get("difficulty", 1) >= min_difficulty]
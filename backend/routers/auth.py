@@ -78,11 +78,20 @@ async def register(user_data: UserCreate):
                 (user_id,)
             )
             
+            # Empty dashboard summary, so dashboard reads never have to create it
+            cursor.execute(
+                """INSERT INTO user_dashboard_summary
+                   (user_id, total_lessons, today_date, today_xp, today_lessons, score_sum)
+                   VALUES (%s, 0, CURDATE(), 0, 0, 0)""",
+                (user_id,)
+            )
+            
             # Generate token
             token = create_access_token({
                 "sub": str(user_id),
                 "email": user_data.email.lower(),
-                "role": "student"
+                "role": "student",
+                "cefr_level": None
             })
             
             return TokenResponse(
@@ -138,7 +147,8 @@ async def login(credentials: UserLogin):
             token = create_access_token({
                 "sub": str(user["id"]),
                 "email": user["email"],
-                "role": user["role"]
+                "role": user["role"],
+                "cefr_level": user["cefr_level"]
             })
             
             return TokenResponse(
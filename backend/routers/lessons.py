@@ -7,17 +7,23 @@ from datetime import datetime, date
 import json
 import logging
 
-from utils.jwt_handler import get_current_user
+from utils.jwt_handler import get_current_user, refresh_access_token
+from utils.cache import invalidate_user
 from database import get_db_cursor
 from services.xp_calculator import XPCalculator
 from services.achievement_service import AchievementService
 from services.achievement_service import AchievementService
+from services.skill_stats_service import SkillStatsService
+from services.dashboard_summary_service import DashboardSummaryService
 from services.ai_engine import AIAdaptiveEngine
 from models.lesson import LessonSubmission, LessonResult, AnswerSubmission
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+# CEFR level -> position, used for pack locking
+_LEVEL_IDX = {"A1": 0, "A2": 1, "B1": 2, "B2": 3, "C1": 4, "C2": 5}
+
 
 @router.get("/daily/cards")
 async def get_daily_cards(current_user: dict = Depends(get_current_user)):
@@ -84,8 +90,9 @@ async def get_daily_lesson(current_user: dict = Depends(get_current_user)):
             cursor.execute(
                 """SELECT id FROM user_progress 
                    WHERE user_id = %s 
-                   AND DATE(completed_at) = CURDATE()
-                   AND lesson_id IN (SELECT id FROM lessons WHERE type = 'daily')""",
+                   AND completed_at >= CURDATE() AND completed_at < CURDATE() + INTERVAL 1 DAY
+                   AND lesson_id IN (SELECT id FROM lessons WHERE type = 'daily')
+                   LIMIT 1""",
                 (current_user["user_id"],)
             )
             completed_today = cursor.fetchone()
@@ -353,8 +360,7 @@ async def get_lesson_packs(current_user: dict = Depends(get_current_user)):
                 packs = _get_sample_lesson_packs(user_level)
             else:
                 # Determine which packs are unlocked
-                level_order = ["A1", "A2", "B1", "B2", "C1", "C2"]
-                user_level_index = level_order.index(user_level)
+                user_level_index = _LEVEL_IDX[user_level]
                 
                 packs = [
                     {
@@ -365,7 +371,7 @@ async def get_lesson_packs(current_user: dict = Depends(get_current_user)):
                         "total_lessons": p["total_lessons"],
                         "completed_lessons": p["completed_lessons"],
                         "progress_percent": int((p["completed_lessons"] / p["total_lessons"]) * 100) if p["total_lessons"] > 0 else 0,
-                        "is_locked": level_order.index(p["cefr_level"]) > user_level_index,
+                        "is_locked": _LEVEL_IDX[p["cefr_level"]] > user_level_index,
                         "icon": p["icon"] or "📚"
                     }
                     for p in packs
@@ -479,9 +485,12 @@ async def submit_lesson(
     """
     try:
         with get_db_cursor() as cursor:
-            # Get user data
+            # Get user data, with earned badges for the achievement check
             cursor.execute(
-                "SELECT cefr_level, xp_total, current_streak, longest_streak FROM users WHERE id = %s",
+                """SELECT cefr_level, xp_total, current_streak, longest_streak,
+                          (SELECT GROUP_CONCAT(badge_type) FROM achievements
+                           WHERE user_id = users.id) as badges
+                   FROM users WHERE id = %s""",
                 (current_user["user_id"],)
             )
             user = cursor.fetchone()
@@ -568,7 +577,7 @@ async def submit_lesson(
             
             # Check for level up
             old_xp = user["xp_total"] or 0
-            new_xp = old_xp + xp_data["xp_total"]
+            new_xp = old_xp + xp_data.xp_total
             level_up, old_level, new_level = XPCalculator.check_level_up(old_xp, new_xp)
             
             # Update user
@@ -594,12 +603,14 @@ async def submit_lesson(
                     current_user["user_id"],
                     lesson_id,
                     score,
-                    xp_data["xp_total"],
+                    xp_data.xp_total,
                     json.dumps(results),
                     datetime.now(),
                     submission.total_time_seconds
                 )
             )
+            SkillStatsService.record_answers(cursor, current_user["user_id"], results)
+            DashboardSummaryService.record_progress(cursor, current_user["user_id"], xp_data.xp_total, score)
             
             # Get lesson type
             cursor.execute("SELECT type FROM lessons WHERE id = %s", (lesson_id,))
@@ -645,22 +656,30 @@ async def submit_lesson(
                 cursor, 
                 current_user["user_id"], 
                 current_stats, 
-                activity_details
+                activity_details,
+                existing_badges=set(user["badges"].split(",")) if user["badges"] else set()
             )
 
-            return LessonResult(
+            result = LessonResult(
                 lesson_id=lesson_id,
                 score=score,
                 total_questions=total_questions,
                 correct_count=correct_count,
-                xp_earned=xp_data["xp_total"],
-                streak_bonus=xp_data["xp_streak_bonus"],
+                xp_earned=xp_data.xp_total,
+                streak_bonus=xp_data.xp_streak_bonus,
                 new_streak=new_streak,
                 level_up=level_up,
                 new_level=new_level if level_up else None,
                 mistakes=mistakes,
-                new_achievements=new_achievements
+                new_achievements=new_achievements,
+                access_token=(
+                    refresh_access_token(current_user, cefr_level=final_level)
+                    if final_level != current_user.get("cefr_level") else None
+                )
             )
+        # After the commit, so a concurrent dashboard load can't re-cache old totals
+        invalidate_user(current_user["user_id"])
+        return result
     except Exception as e:
         logger.error(f"Submit lesson error: {e}")
         raise HTTPException(status_code=500, detail="Failed to submit lesson")
@@ -764,8 +783,7 @@ def _get_sample_vocabulary_questions(level: str):
 
 def _get_sample_lesson_packs(level: str):
     """Get sample lesson packs"""
-    level_order = ["A1", "A2", "B1", "B2", "C1", "C2"]
-    user_index = level_order.index(level)
+    user_index = _LEVEL_IDX[level]
     
     packs = [
         {"id": 1, "title": "Basics 1", "description": "Start your English journey", "cefr_level": "A1", "total_lessons": 5, "completed_lessons": 0, "icon": "🌱"},
@@ -779,8 +797,7 @@ def _get_sample_lesson_packs(level: str):
     ]
     
     for pack in packs:
-        pack_index = level_order.index(pack["cefr_level"])
-        pack["is_locked"] = pack_index > user_index
+        pack["is_locked"] = _LEVEL_IDX[pack["cefr_level"]] > user_index
         pack["progress_percent"] = 0
     
     return packs
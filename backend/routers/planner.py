@@ -5,6 +5,7 @@ from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel
 from typing import List, Optional
 from datetime import datetime, time
+from collections import Counter
 import json
 import logging
 
@@ -14,6 +15,9 @@ from database import get_db_cursor
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+# Most recent sessions considered when recommending focus skills
+WEAK_SKILL_SCAN_LIMIT = 500
+
 
 class StudyPlanUpdate(BaseModel):
     daily_goal_minutes: Optional[int] = None
@@ -54,39 +58,18 @@ async def get_study_plan(current_user: dict = Depends(get_current_user)):
                     pass
             
             # Generate recommended focus skills based on performance (MariaDB compatible)
+            # Newest first so the scan can stop once enough weak skills are found;
+            # recent sessions are enough for a recommendation, so cap the read
             cursor.execute(
-                """SELECT answers FROM user_progress WHERE user_id = %s""",
-                (current_user["user_id"],)
+                """SELECT answers FROM user_progress WHERE user_id = %s
+                   ORDER BY completed_at DESC
+                   LIMIT %s""",
+                (current_user["user_id"], WEAK_SKILL_SCAN_LIMIT)
             )
             progress_rows = cursor.fetchall()
-            
-            # Process answers in Python to get skill stats
-            skill_stats = {}
-            for row in progress_rows:
-                if row["answers"]:
-                    try:
-                        answers = json.loads(row["answers"]) if isinstance(row["answers"], str) else row["answers"]
-                        if isinstance(answers, list):
-                            for answer in answers:
-                                if isinstance(answer, dict):
-                                    skill = answer.get("skill_tag")
-                                    is_correct = answer.get("is_correct", False)
-                                    if skill:
-                                        if skill not in skill_stats:
-                                            skill_stats[skill] = {"total": 0, "correct": 0}
-                                        skill_stats[skill]["total"] += 1
-                                        if is_correct:
-                                            skill_stats[skill]["correct"] += 1
-                    except (json.JSONDecodeError, TypeError):
-                        pass
-            
-            weak_skills = []
-            for skill, stats in skill_stats.items():
-                if stats["total"] > 0:
-                    accuracy = (stats["correct"] / stats["total"]) * 100
-                    if accuracy < 70:
-                        weak_skills.append(skill)
-            
+
+            weak_skills = _get_weak_skills(progress_rows, limit=3)
+
             return {
                 "daily_goal_minutes": settings["daily_goal_minutes"] if settings else 15,
                 "study_days": study_days,
@@ -155,7 +138,8 @@ async def get_reminder_status(current_user: dict = Depends(get_current_user)):
                 """SELECT COUNT(*) as lessons_today,
                           COALESCE(SUM(xp_earned), 0) as xp_today
                    FROM user_progress
-                   WHERE user_id = %s AND DATE(completed_at) = CURDATE()""",
+                   WHERE user_id = %s
+                     AND completed_at >= CURDATE() AND completed_at < CURDATE() + INTERVAL 1 DAY""",
                 (current_user["user_id"],)
             )
             today = cursor.fetchone()
@@ -198,6 +182,51 @@ async def get_reminder_status(current_user: dict = Depends(get_current_user)):
         raise HTTPException(status_code=500, detail="Failed to get reminder status")
 
 
+def _get_weak_skills(progress_rows: List[dict], limit: int = 3) -> List[str]:
+    """
+    Get up to `limit` skills with accuracy below 70%.
+    Rows are expected newest first; stats are accumulated row by row and the
+    scan stops as soon as `limit` skills fall below the threshold.
+    """
+    totals = Counter()
+    corrects = Counter()
+    weak_skills = []
+
+    for row in progress_rows:
+        if not row["answers"]:
+            continue
+        try:
+            answers = json.loads(row["answers"]) if isinstance(row["answers"], str) else row["answers"]
+        except (json.JSONDecodeError, TypeError):
+            continue
+        if not isinstance(answers, list):
+            continue
+
+        skills = []
+        correct_skills = []
+        for answer in answers:
+            if isinstance(answer, dict):
+                skill = answer.get("skill_tag")
+                if skill:
+                    skills.append(skill)
+                    if answer.get("is_correct", False):
+                        correct_skills.append(skill)
+        if not skills:
+            continue
+
+        totals.update(skills)
+        corrects.update(correct_skills)
+
+        weak_skills = [
+            skill for skill, total in totals.items()
+            if corrects[skill] * 100 < total * 70
+        ]
+        if len(weak_skills) >= limit:
+            break
+
+    return weak_skills[:limit]
+
+
 def _generate_suggested_schedule(study_days: List[str]) -> List[dict]:
     """Generate a suggested weekly schedule"""
     day_activities = {
@@ -3,19 +3,47 @@ Review Router - UC12: Review Mode
 """
 from fastapi import APIRouter, HTTPException, Depends
 from typing import List
-from datetime import datetime
-import json
+import orjson
 import logging
 
 from utils.jwt_handler import get_current_user
+from utils.cache import invalidate_user
 from database import get_db_cursor
 from services.ai_engine import AIAdaptiveEngine
 from services.xp_calculator import XPCalculator
+from services.skill_stats_service import SkillStatsService
+from services.dashboard_summary_service import DashboardSummaryService
 from models.lesson import AnswerSubmission
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+REVIEW_QUIZ_SIZE = 10
+
+# Returned when the user has nothing left to review
+_EMPTY_REVIEW = {
+    "title": "Review Mode",
+    "description": "Great job! You have no pending mistakes to review.",
+    "total_questions": 0,
+    "based_on_mistakes": 0,
+    "questions": [],
+    "xp_reward": 0,
+    "can_exit_early": True,
+    "message": "You're all caught up! Go generate some more mistakes... or not! 🎉"
+}
+
+# Statement texts are kept constant so the server sees the same SQL on every call
+_SQL_ACTIVE_MISTAKES = """SELECT question_id, source_type, created_at
+                          FROM user_mistakes
+                          WHERE user_id = %s
+                          ORDER BY created_at DESC
+                          LIMIT 20"""
+
+# Always REVIEW_QUIZ_SIZE placeholders; unused slots are padded with id 0 (never matches)
+_SQL_REVIEW_QUESTIONS = f"""SELECT id, type, content, skill_tag, correct_answer
+                            FROM questions
+                            WHERE id IN ({','.join(['%s'] * REVIEW_QUIZ_SIZE)})"""
+
 
 @router.get("/generate")
 async def generate_review_quiz(current_user: dict = Depends(get_current_user)):
@@ -25,61 +53,44 @@ async def generate_review_quiz(current_user: dict = Depends(get_current_user)):
     """
     try:
         with get_db_cursor() as cursor:
-            # Get user's active mistakes from user_mistakes table
+            # Trigger-maintained counter lets caught-up users skip the mistakes scan
             cursor.execute(
-                """SELECT question_id, source_type, created_at
-                   FROM user_mistakes
-                   WHERE user_id = %s
-                   ORDER BY created_at DESC
-                   LIMIT 20""",
+                "SELECT pending_mistakes_count FROM users WHERE id = %s",
                 (current_user["user_id"],)
             )
+            user = cursor.fetchone()
+            if not user or not user["pending_mistakes_count"]:
+                return dict(_EMPTY_REVIEW)
+            
+            # Get user's active mistakes from user_mistakes table
+            cursor.execute(_SQL_ACTIVE_MISTAKES, (current_user["user_id"],))
             mistake_records = cursor.fetchall()
             
             # Collect question IDs
             question_ids = [m["question_id"] for m in mistake_records]
             
-            # If no mistakes found, try general review
             if not question_ids:
-                cursor.execute(
-                    "SELECT cefr_level FROM users WHERE id = %s",
-                    (current_user["user_id"],)
-                )
-                user = cursor.fetchone()
-                return {
-                    "title": "Review Mode",
-                    "description": "Great job! You have no pending mistakes to review.",
-                    "total_questions": 0,
-                    "based_on_mistakes": 0,
-                    "questions": [],
-                    "xp_reward": 0,
-                    "can_exit_early": True,
-                    "message": "You're all caught up! Go generate some more mistakes... or not! 🎉"
-                }
+                return dict(_EMPTY_REVIEW)
             
             # Limit to 10 questions for the quiz
-            question_ids = question_ids[:10]
+            question_ids = question_ids[:REVIEW_QUIZ_SIZE]
             
             # Get actual questions if ids exist
             if question_ids:
-                placeholders = ','.join(['%s'] * len(question_ids))
-                cursor.execute(
-                    f"""SELECT id, type, content, skill_tag, correct_answer
-                       FROM questions WHERE id IN ({placeholders})""",
-                    tuple(question_ids)
-                )
+                padding = (0,) * (REVIEW_QUIZ_SIZE - len(question_ids))
+                cursor.execute(_SQL_REVIEW_QUESTIONS, tuple(question_ids) + padding)
                 questions = cursor.fetchall()
             else:
                 questions = []
             
             formatted_questions = []
             for q in questions:
-                content = q["content"] if isinstance(q["content"], dict) else json.loads(q["content"])
+                content = q["content"] if isinstance(q["content"], dict) else orjson.loads(q["content"])
                 
                 # Parse correct_answer if it's a JSON string
                 correct_ans = q["correct_answer"]
                 try:
-                    correct_ans = json.loads(correct_ans)
+                    correct_ans = orjson.loads(correct_ans)
                 except:
                     pass
 
@@ -93,16 +104,7 @@ async def generate_review_quiz(current_user: dict = Depends(get_current_user)):
             
             if not formatted_questions:
                 # No mistakes found - Return empty state
-                return {
-                    "title": "Review Mode",
-                    "description": "Great job! You have no pending mistakes to review.",
-                    "total_questions": 0,
-                    "based_on_mistakes": 0,
-                    "questions": [],
-                    "xp_reward": 0,
-                    "can_exit_early": True,
-                    "message": "You're all caught up! Go generate some more mistakes... or not! 🎉"
-                }
+                return dict(_EMPTY_REVIEW)
             
             return {
                 "title": "Review Mode",
@@ -137,45 +139,60 @@ async def submit_review(
             )
             user = cursor.fetchone()
             
+            # Fetch all answered questions in one query
+            question_map = {}
+            question_ids = list({a.question_id for a in answers})
+            if question_ids:
+                placeholders = ','.join(['%s'] * len(question_ids))
+                cursor.execute(
+                    f"""SELECT id, correct_answer, skill_tag
+                       FROM questions WHERE id IN ({placeholders})""",
+                    tuple(question_ids)
+                )
+                # Normalize each correct answer once, not once per submitted answer
+                for q in cursor.fetchall():
+                    correct_answer = q["correct_answer"]
+                    if isinstance(correct_answer, str):
+                        try:
+                            correct_answer = orjson.loads(correct_answer)
+                        except orjson.JSONDecodeError:
+                            pass
+                    question_map[q["id"]] = (_normalize_answer(correct_answer), q["skill_tag"])
+            
             # Process answers
             correct_count = 0
             results = []
             updated_words = []
             
             for answer in answers:
-                cursor.execute(
-                    "SELECT correct_answer, skill_tag FROM questions WHERE id = %s",
-                    (answer.question_id,)
-                )
-                question = cursor.fetchone()
+                question = question_map.get(answer.question_id)
                 
                 if question:
-                    correct_answer = question["correct_answer"]
-                    if isinstance(correct_answer, str):
-                        try:
-                            correct_answer = json.loads(correct_answer)
-                        except:
-                            pass
-                    
-                    is_correct = str(answer.user_answer).lower().strip() == str(correct_answer).lower().strip()
+                    correct_answer, skill_tag = question
+                    is_correct = _normalize_answer(answer.user_answer) == correct_answer
                     
                     if is_correct:
                         correct_count += 1
-                        # Remove from user_mistakes if correct
-                        cursor.execute(
-                            "DELETE FROM user_mistakes WHERE user_id = %s AND question_id = %s",
-                            (current_user["user_id"], answer.question_id)
-                        )
                         updated_words.append(answer.question_id)
                     
                     results.append({
                         "question_id": answer.question_id,
                         "is_correct": is_correct,
-                        "skill_tag": question["skill_tag"]
+                        "skill_tag": skill_tag
                     })
             
-            # Calculate XP (reduced for partial completion)
+            # Remove correctly answered questions from user_mistakes
+            if updated_words:
+                placeholders = ','.join(['%s'] * len(updated_words))
+                cursor.execute(
+                    f"""DELETE FROM user_mistakes
+                       WHERE user_id = %s AND question_id IN ({placeholders})""",
+                    (current_user["user_id"], *updated_words)
+                )
+            
+            # Calculate score and XP (XP reduced for partial completion)
             total_questions = len(answers)
+            score = (correct_count * 100) // total_questions if total_questions else 0
             completion_rate = 1.0 if not partial else 0.7
             
             xp_data = XPCalculator.calculate_lesson_xp(
@@ -184,7 +201,7 @@ async def submit_review(
                 user["current_streak"] or 0,
                 "daily"
             )
-            xp_earned = int(xp_data["xp_total"] * completion_rate)
+            xp_earned = int(xp_data.xp_total * completion_rate)
             
             # Update user XP
             cursor.execute(
@@ -195,30 +212,33 @@ async def submit_review(
             # Save progress
             cursor.execute(
                 """INSERT INTO user_progress 
-                   (user_id, lesson_id, score, xp_earned, answers, completed_at, time_spent_seconds)
-                   VALUES (%s, 0, %s, %s, %s, %s, 0)""",
+                   (user_id, lesson_id, score, xp_earned, answers, time_spent_seconds)
+                   VALUES (%s, 0, %s, %s, %s, 0)""",
                 (
                     current_user["user_id"],
-                    int((correct_count / total_questions) * 100) if total_questions > 0 else 0,
+                    score,
                     xp_earned,
-                    json.dumps(results),
-                    datetime.now()
+                    orjson.dumps(results).decode()
                 )
             )
+            SkillStatsService.record_answers(cursor, current_user["user_id"], results)
+            DashboardSummaryService.record_progress(cursor, current_user["user_id"], xp_earned, score)
             
             # Analyze performance
             analysis = AIAdaptiveEngine.analyze_performance(results)
             
-            return {
+            result = {
                 "success": True,
                 "partial": partial,
-                "score": int((correct_count / total_questions) * 100) if total_questions > 0 else 0,
+                "score": score,
                 "correct_count": correct_count,
                 "total_questions": total_questions,
                 "xp_earned": xp_earned,
                 "analysis": analysis,
                 "message": "Review completed!" if not partial else "Progress saved. Come back to continue!"
             }
+        invalidate_user(current_user["user_id"])
+        return result
     except Exception as e:
         logger.error(f"Submit review error: {e}")
         raise HTTPException(status_code=500, detail="Failed to submit review")
@@ -267,6 +287,13 @@ async def get_review_stats(current_user: dict = Depends(get_current_user)):
         raise HTTPException(status_code=500, detail="Failed to get stats")
 
 
+def _normalize_answer(value) -> str:
+    """Case- and whitespace-insensitive form of an answer for comparison"""
+    if not isinstance(value, str):
+        value = str(value)
+    return value.casefold().strip()
+
+
 def _generate_general_review(level: str):
     """Generate general review questions when no mistakes exist"""
     questions = [
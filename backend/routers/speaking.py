@@ -1,15 +1,23 @@
 """
 Speaking Router - UC9, UC10: AI Roleplay (Prepare Me) and Free Talk (Talk Loop)
 """
-from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, Form
-from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, Form, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, RedirectResponse, StreamingResponse
+from typing import AsyncIterator, List, Optional
 from datetime import datetime
-import json
+import asyncio
+import hashlib
+import orjson
 import logging
 import base64
+import os
+import tempfile
 
 from utils.jwt_handler import get_current_user
 from utils.encryption import decrypt_api_key
+from utils.cache import invalidate_user, speech_service_cache
+from config import settings as app_settings
 from database import get_db_cursor
 from services.speech_service import SpeechService
 from services.xp_calculator import XPCalculator
@@ -47,9 +55,70 @@ ROLEPLAY_SCENARIOS = {
     ]
 }
 
+LEVEL_ORDER = ["A1", "A2", "B1", "B2", "C1", "C2"]
+LEVEL_INDEX = {level: i for i, level in enumerate(LEVEL_ORDER)}
+
+# Skills scored on every free talk turn
+SCORE_SKILLS = ("fluency", "grammar", "vocabulary")
+
+# Lookup indices built once at import - treat as read-only
+SCENARIO_BY_ID = {
+    s["id"]: (level, s)
+    for level, scenarios in ROLEPLAY_SCENARIOS.items()
+    for s in scenarios
+}
+
+# Scenarios at each level and below, annotated with their own level
+SCENARIOS_UP_TO_LEVEL = {
+    level: [
+        {**s, "level": lower}
+        for lower in LEVEL_ORDER[:LEVEL_INDEX[level] + 1]
+        for s in ROLEPLAY_SCENARIOS.get(lower, [])
+    ]
+    for level in LEVEL_ORDER
+}
+
+# Text-to-speech audio is content-addressed (sha256 of the text), so a URL's
+# bytes never change and browsers, proxies or a CDN can cache it forever
+TTS_MAX_CHARS = 1000
+TTS_CACHE_CONTROL = "public, max-age=31536000, immutable"
+_HEX_DIGITS = frozenset("0123456789abcdef")
+
+# /scenarios has one possible body per level - serialize each once
+SCENARIO_RESPONSES = {
+    level: orjson.dumps({"user_level": level, "scenarios": scenarios})
+    for level, scenarios in SCENARIOS_UP_TO_LEVEL.items()
+}
+
+
+def _load_score_totals(scores: dict) -> dict:
+    """
+    Normalize stored free talk scores to running {"sum", "n"} totals per skill.
+    Sessions saved before totals were kept hold a list of every turn's score.
+    """
+    totals = {}
+    for skill in SCORE_SKILLS:
+        value = scores.get(skill)
+        if isinstance(value, dict):
+            totals[skill] = {"sum": value.get("sum", 0), "n": value.get("n", 0)}
+        elif isinstance(value, list):
+            totals[skill] = {"sum": sum(value), "n": len(value)}
+        else:
+            totals[skill] = {"sum": 0, "n": 0}
+    return totals
+
 
 async def _get_speech_service(user_id: int) -> SpeechService:
     """Get speech service configured with user's API keys"""
+    service = speech_service_cache.get(user_id)
+    if service is None:
+        service = await run_in_threadpool(_build_speech_service, user_id)
+        speech_service_cache[user_id] = service
+    return service
+
+
+def _build_speech_service(user_id: int) -> SpeechService:
+    """Load the user's AI settings and build a speech service from them"""
     with get_db_cursor() as cursor:
         cursor.execute(
             """SELECT openai_api_key, gemini_api_key, preferred_ai 
@@ -71,6 +140,190 @@ async def _get_speech_service(user_id: int) -> SpeechService:
         )
 
 
+def _tts_audio_path(digest: str) -> str:
+    """Where the audio for a text digest is stored"""
+    return os.path.join(app_settings.TTS_AUDIO_DIR, digest + ".mp3")
+
+
+def _open_tts_temp(path: str):
+    """Open a uniquely named temp file next to path (one per writer, even within a process)"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return tempfile.NamedTemporaryFile(dir=os.path.dirname(path), suffix=".tmp", delete=False)
+
+
+def _publish_tts_audio(tmp, path: str):
+    """Move a finished temp file into place atomically, then enforce the file cap"""
+    tmp.close()
+    os.replace(tmp.name, path)
+    _prune_tts_audio(os.path.dirname(path))
+
+
+def _prune_tts_audio(directory: str):
+    """Remove the oldest stored audio once the directory is over TTS_AUDIO_MAX_FILES"""
+    entries = [e for e in os.scandir(directory) if e.name.endswith(".mp3")]
+    excess = len(entries) - app_settings.TTS_AUDIO_MAX_FILES
+    if excess <= 0:
+        return
+    entries.sort(key=lambda e: e.stat().st_mtime)
+    for entry in entries[:excess]:
+        try:
+            os.remove(entry.path)
+        except FileNotFoundError:
+            pass  # Another worker pruned it first
+
+
+async def _relay_and_store_tts(first: bytes, chunks: AsyncIterator[bytes], path: str):
+    """
+    Relay synthesised audio to the client while writing it to a temp file,
+    publishing it under its digest only once the whole stream has arrived
+    """
+    tmp = await run_in_threadpool(_open_tts_temp, path)
+    try:
+        await run_in_threadpool(tmp.write, first)
+        yield first
+        async for chunk in chunks:
+            await run_in_threadpool(tmp.write, chunk)
+            yield chunk
+    except BaseException:
+        # Client disconnected or the provider failed mid-stream; never publish a
+        # partial file. Cleanup stays synchronous as the task may be cancelled.
+        tmp.close()
+        os.remove(tmp.name)
+        raise
+    await run_in_threadpool(_publish_tts_audio, tmp, path)
+
+
+# The database driver is synchronous; the helpers below are run through
+# run_in_threadpool so a slow query doesn't stall the event loop.
+
+def _get_user_level(user_id: int) -> str:
+    """Get the user's CEFR level (A1 if not assessed)"""
+    with get_db_cursor() as cursor:
+        cursor.execute(
+            "SELECT cefr_level FROM users WHERE id = %s",
+            (user_id,)
+        )
+        user = cursor.fetchone()
+        return user["cefr_level"] or "A1"
+
+
+async def _resolve_user_level(current_user: dict) -> str:
+    """Take the level from the token claim; only older or unassessed tokens hit the DB"""
+    level = current_user.get("cefr_level")
+    if level:
+        return level
+    return await run_in_threadpool(_get_user_level, current_user["user_id"])
+
+
+def _get_session(session_id: int, user_id: int) -> Optional[dict]:
+    """Get a conversation session together with the user's level"""
+    with get_db_cursor() as cursor:
+        cursor.execute(
+            """SELECT u.cefr_level, c.messages, c.scores
+               FROM conversation_history c
+               JOIN users u ON u.id = c.user_id
+               WHERE c.id = %s AND c.user_id = %s""",
+            (session_id, user_id)
+        )
+        return cursor.fetchone()
+
+
+def _create_session(user_id: int, session_type: str, messages: list) -> int:
+    """Insert a new conversation session and return its id"""
+    with get_db_cursor() as cursor:
+        # created_at comes from the database clock, which is what
+        # _finish_free_talk measures the session duration against
+        cursor.execute(
+            """INSERT INTO conversation_history 
+               (user_id, session_type, messages, scores, created_at)
+               VALUES (%s, %s, %s, '{}', NOW())""",
+            (user_id, session_type, orjson.dumps(messages).decode())
+        )
+        return cursor.lastrowid
+
+
+def _save_session(session_id: int, new_messages: list, scores: dict,
+                  user_id: int = None, xp: int = 0):
+    """
+    Append a turn's messages to a session and store its scores, awarding XP
+    to the user if given. Only the new messages are sent; the array is
+    extended in the database so the history isn't re-encoded every turn.
+    """
+    messages_json = orjson.dumps(new_messages).decode()
+    scores_json = orjson.dumps(scores).decode()
+    with get_db_cursor() as cursor:
+        if xp:
+            # Session and XP in one multi-table statement
+            cursor.execute(
+                """UPDATE conversation_history c
+                   JOIN users u ON u.id = c.user_id
+                   SET c.messages = JSON_MERGE_PRESERVE(COALESCE(c.messages, JSON_ARRAY()), %s),
+                       c.scores = %s,
+                       u.xp_total = u.xp_total + %s
+                   WHERE c.id = %s AND c.user_id = %s""",
+                (messages_json, scores_json, xp, session_id, user_id)
+            )
+        else:
+            cursor.execute(
+                """UPDATE conversation_history 
+                   SET messages = JSON_MERGE_PRESERVE(COALESCE(messages, JSON_ARRAY()), %s),
+                       scores = %s
+                   WHERE id = %s""",
+                (messages_json, scores_json, session_id)
+            )
+
+
+def _finish_free_talk(session_id: int, user_id: int) -> dict:
+    """Score a free talk session and award its XP"""
+    with get_db_cursor() as cursor:
+        cursor.execute(
+            """SELECT messages, scores,
+                      COALESCE(TIMESTAMPDIFF(SECOND, created_at, NOW()), 0) as duration_seconds
+               FROM conversation_history WHERE id = %s AND user_id = %s""",
+            (session_id, user_id)
+        )
+        session = cursor.fetchone()
+        
+        if not session:
+            raise HTTPException(status_code=404, detail="Session not found")
+        
+        messages = orjson.loads(session["messages"]) if session["messages"] else []
+        scores = _load_score_totals(orjson.loads(session["scores"]) if session["scores"] else {})
+        
+        # Calculate final scores
+        final_scores = {
+            skill: totals["sum"] / max(totals["n"], 1)
+            for skill, totals in scores.items()
+        }
+        
+        # Full elapsed seconds (timedelta.seconds used to drop whole days)
+        duration = session["duration_seconds"]
+        
+        # Award XP
+        xp = XPCalculator.calculate_speaking_xp(
+            final_scores["fluency"],
+            final_scores["grammar"],
+            final_scores["vocabulary"],
+            duration
+        )
+        
+        cursor.execute(
+            "UPDATE users SET xp_total = xp_total + %s WHERE id = %s",
+            (xp, user_id)
+        )
+        
+        user_messages = len([m for m in messages if not m["is_ai"]])
+        
+        return {
+            "session_id": session_id,
+            "duration_seconds": duration,
+            "message_count": user_messages,
+            "final_scores": final_scores,
+            "xp_earned": xp,
+            "summary": f"Great session! You exchanged {user_messages} messages over {duration // 60} minutes."
+        }
+
+
 @router.get("/scenarios")
 async def get_roleplay_scenarios(current_user: dict = Depends(get_current_user)):
     """
@@ -78,31 +331,14 @@ async def get_roleplay_scenarios(current_user: dict = Depends(get_current_user))
     FR11: Voice-input conversational practice
     """
     try:
-        with get_db_cursor() as cursor:
-            cursor.execute(
-                "SELECT cefr_level FROM users WHERE id = %s",
-                (current_user["user_id"],)
-            )
-            user = cursor.fetchone()
-            user_level = user["cefr_level"] or "A1"
-            
-            # Get scenarios for user's level and below
-            available_scenarios = []
-            level_order = ["A1", "A2", "B1", "B2", "C1", "C2"]
-            user_index = level_order.index(user_level)
-            
-            for level in level_order[:user_index + 1]:
-                if level in ROLEPLAY_SCENARIOS:
-                    for scenario in ROLEPLAY_SCENARIOS[level]:
-                        available_scenarios.append({
-                            **scenario,
-                            "level": level
-                        })
-            
-            return {
-                "user_level": user_level,
-                "scenarios": available_scenarios
-            }
+        user_level = await _resolve_user_level(current_user)
+        
+        # Scenarios for user's level and below
+        return Response(
+            content=SCENARIO_RESPONSES.get(user_level, SCENARIO_RESPONSES["A1"]),
+            media_type="application/json",
+            headers={"Cache-Control": "private, max-age=300"}
+        )
     except Exception as e:
         logger.error(f"Get scenarios error: {e}")
         raise HTTPException(status_code=500, detail="Failed to load scenarios")
@@ -118,24 +354,14 @@ async def start_roleplay(
     FR11: Start 5-turn conversational roleplay
     """
     try:
-        with get_db_cursor() as cursor:
-            cursor.execute(
-                "SELECT cefr_level FROM users WHERE id = %s",
-                (current_user["user_id"],)
-            )
-            user = cursor.fetchone()
-            user_level = user["cefr_level"] or "A1"
+        now = datetime.now()
+        user_level = await _resolve_user_level(current_user)
         
         # Find scenario
-        scenario = None
-        for level_scenarios in ROLEPLAY_SCENARIOS.values():
-            for s in level_scenarios:
-                if s["id"] == scenario_id:
-                    scenario = s
-                    break
-        
-        if not scenario:
+        match = SCENARIO_BY_ID.get(scenario_id)
+        if not match:
             raise HTTPException(status_code=404, detail="Scenario not found")
+        scenario = match[1]
         
         # Get AI service
         service = await _get_speech_service(current_user["user_id"])
@@ -148,24 +374,16 @@ async def start_roleplay(
         )
         
         # Create session record
-        session_id = int(datetime.now().timestamp() * 1000)
-        
-        with get_db_cursor() as cursor:
-            cursor.execute(
-                """INSERT INTO conversation_history 
-                   (user_id, session_type, messages, scores, created_at)
-                   VALUES (%s, 'roleplay', %s, '{}', %s)""",
-                (
-                    current_user["user_id"],
-                    json.dumps([{
-                        "is_ai": True,
-                        "text": result.get("response", scenario["context"]),
-                        "timestamp": datetime.now().isoformat()
-                    }]),
-                    datetime.now()
-                )
-            )
-            session_id = cursor.lastrowid
+        session_id = await run_in_threadpool(
+            _create_session,
+            current_user["user_id"],
+            "roleplay",
+            [{
+                "is_ai": True,
+                "text": result.get("response", scenario["context"]),
+                "timestamp": now.isoformat()
+            }]
+        )
         
         return {
             "session_id": session_id,
@@ -195,32 +413,22 @@ async def roleplay_respond(
     FR12: Receive feedback on fluency, grammar, vocabulary
     """
     try:
-        with get_db_cursor() as cursor:
-            cursor.execute(
-                "SELECT cefr_level FROM users WHERE id = %s",
-                (current_user["user_id"],)
-            )
-            user = cursor.fetchone()
-            user_level = user["cefr_level"] or "A1"
-            
-            # Get session
-            cursor.execute(
-                "SELECT messages FROM conversation_history WHERE id = %s AND user_id = %s",
-                (session_id, current_user["user_id"])
-            )
-            session = cursor.fetchone()
-            
-            if not session:
-                raise HTTPException(status_code=404, detail="Session not found")
+        now_iso = datetime.now().isoformat()
+        
+        # Get session together with the user's level
+        session = await run_in_threadpool(_get_session, session_id, current_user["user_id"])
+        if not session:
+            raise HTTPException(status_code=404, detail="Session not found")
+        user_level = session["cefr_level"] or "A1"
         
-        messages = json.loads(session["messages"]) if session["messages"] else []
+        messages = orjson.loads(session["messages"]) if session["messages"] else []
         service = await _get_speech_service(current_user["user_id"])
         
         # Transcribe audio if provided
         transcript = user_text
-        if audio and not user_text:
-            audio_data = await audio.read()
-            transcription = await service.transcribe_audio(audio_data)
+        if not user_text and audio is not None and audio.filename:
+            # Hand the spooled upload straight to the client instead of copying it into memory
+            transcription = await service.transcribe_audio(audio.file)
             if transcription["success"]:
                 transcript = transcription["text"]
             else:
@@ -230,16 +438,17 @@ async def roleplay_respond(
             raise HTTPException(status_code=400, detail="No input provided")
         
         # Add user message
+        saved_count = len(messages)
         messages.append({
             "is_ai": False,
             "text": transcript,
-            "timestamp": datetime.now().isoformat()
+            "timestamp": now_iso
         })
         
         current_turn = sum(1 for m in messages if not m["is_ai"])
         
         # Analyze user's speech
-        analysis = await service.analyze_speech(
+        analysis_call = service.analyze_speech(
             transcript,
             messages[-2]["text"] if len(messages) > 1 else "",
             user_level
@@ -250,46 +459,47 @@ async def roleplay_respond(
         if current_turn < 5:
             # Find scenario context from first AI message
             scenario_context = messages[0]["text"] if messages else ""
-            ai_result = await service.generate_roleplay_response(
-                scenario_context,
-                messages,
-                user_level
+            # Analysis and reply are independent - run both LLM calls concurrently
+            analysis, ai_result = await asyncio.gather(
+                analysis_call,
+                service.generate_roleplay_response(
+                    scenario_context,
+                    messages,
+                    user_level
+                )
             )
             ai_response = ai_result.get("response", "")
             
             messages.append({
                 "is_ai": True,
                 "text": ai_response,
-                "timestamp": datetime.now().isoformat()
+                "timestamp": now_iso
             })
+        else:
+            analysis = await analysis_call
         
-        # Update session
-        with get_db_cursor() as cursor:
-            scores = {
-                "fluency": analysis.get("fluency_score", 0),
-                "grammar": analysis.get("grammar_score", 0),
-                "vocabulary": analysis.get("vocabulary_score", 0)
-            }
-            
-            cursor.execute(
-                """UPDATE conversation_history 
-                   SET messages = %s, scores = %s
-                   WHERE id = %s""",
-                (json.dumps(messages), json.dumps(scores), session_id)
+        scores = {
+            "fluency": analysis.get("fluency_score", 0),
+            "grammar": analysis.get("grammar_score", 0),
+            "vocabulary": analysis.get("vocabulary_score", 0)
+        }
+        
+        # Award XP if session complete
+        xp = 0
+        if current_turn >= 5:
+            xp = XPCalculator.calculate_speaking_xp(
+                analysis.get("fluency_score", 50),
+                analysis.get("grammar_score", 50),
+                analysis.get("vocabulary_score", 50),
+                len(messages) * 10
             )
-            
-            # Award XP if session complete
-            if current_turn >= 5:
-                xp = XPCalculator.calculate_speaking_xp(
-                    analysis.get("fluency_score", 50),
-                    analysis.get("grammar_score", 50),
-                    analysis.get("vocabulary_score", 50),
-                    len(messages) * 10
-                )
-                cursor.execute(
-                    "UPDATE users SET xp_total = xp_total + %s WHERE id = %s",
-                    (xp, current_user["user_id"])
-                )
+        
+        # Store the turn before replying so the next request sees it
+        await run_in_threadpool(
+            _save_session, session_id, messages[saved_count:], scores, current_user["user_id"], xp
+        )
+        if xp:
+            invalidate_user(current_user["user_id"])
         
         return {
             "session_id": session_id,
@@ -306,7 +516,7 @@ async def roleplay_respond(
                 "corrected_text": analysis.get("corrected_text", transcript)
             },
             "hint": ai_result.get("hint", "") if ai_response else "",
-            "xp_earned": xp if current_turn >= 5 else 0
+            "xp_earned": xp
         }
     except HTTPException:
         raise
@@ -322,14 +532,9 @@ async def start_free_talk(current_user: dict = Depends(get_current_user)):
     FR13: Unlimited open-ended conversation
     """
     try:
-        with get_db_cursor() as cursor:
-            cursor.execute(
-                """INSERT INTO conversation_history 
-                   (user_id, session_type, messages, scores, created_at)
-                   VALUES (%s, 'freetalk', '[]', '{}', %s)""",
-                (current_user["user_id"], datetime.now())
-            )
-            session_id = cursor.lastrowid
+        session_id = await run_in_threadpool(
+            _create_session, current_user["user_id"], "freetalk", []
+        )
         
         return {
             "session_id": session_id,
@@ -353,33 +558,24 @@ async def free_talk_respond(
     FR14, FR15: Real-time scoring and natural conversation
     """
     try:
-        with get_db_cursor() as cursor:
-            cursor.execute(
-                "SELECT cefr_level FROM users WHERE id = %s",
-                (current_user["user_id"],)
-            )
-            user = cursor.fetchone()
-            user_level = user["cefr_level"] or "A1"
-            
-            cursor.execute(
-                "SELECT messages, scores FROM conversation_history WHERE id = %s AND user_id = %s",
-                (session_id, current_user["user_id"])
-            )
-            session = cursor.fetchone()
-            
-            if not session:
-                raise HTTPException(status_code=404, detail="Session not found")
+        now_iso = datetime.now().isoformat()
         
-        messages = json.loads(session["messages"]) if session["messages"] else []
-        cumulative_scores = json.loads(session["scores"]) if session["scores"] else {"fluency": [], "grammar": [], "vocabulary": []}
+        # Get session together with the user's level
+        session = await run_in_threadpool(_get_session, session_id, current_user["user_id"])
+        if not session:
+            raise HTTPException(status_code=404, detail="Session not found")
+        user_level = session["cefr_level"] or "A1"
+        
+        messages = orjson.loads(session["messages"]) if session["messages"] else []
+        cumulative_scores = _load_score_totals(orjson.loads(session["scores"]) if session["scores"] else {})
         
         service = await _get_speech_service(current_user["user_id"])
         
         # Transcribe audio if provided
         transcript = user_text
-        if audio and not user_text:
-            audio_data = await audio.read()
-            transcription = await service.transcribe_audio(audio_data)
+        if not user_text and audio is not None and audio.filename:
+            # Hand the spooled upload straight to the client instead of copying it into memory
+            transcription = await service.transcribe_audio(audio.file)
             if transcription["success"]:
                 transcript = transcription["text"]
             else:
@@ -389,15 +585,18 @@ async def free_talk_respond(
             raise HTTPException(status_code=400, detail="No input provided")
         
         # Add user message
+        saved_count = len(messages)
         messages.append({
             "is_ai": False,
             "text": transcript,
-            "timestamp": datetime.now().isoformat()
+            "timestamp": now_iso
         })
         
-        # Analyze and get response
-        analysis = await service.analyze_speech(transcript, "", user_level)
-        ai_result = await service.generate_free_talk_response(transcript, messages, user_level)
+        # Analyze and get response concurrently
+        analysis, ai_result = await asyncio.gather(
+            service.analyze_speech(transcript, "", user_level),
+            service.generate_free_talk_response(transcript, messages, user_level)
+        )
         
         ai_response = ai_result.get("response", "") 
         if ai_result.get("follow_up_question"):
@@ -406,31 +605,25 @@ async def free_talk_respond(
         messages.append({
             "is_ai": True,
             "text": ai_response,
-            "timestamp": datetime.now().isoformat()
+            "timestamp": now_iso
         })
         
-        # Update cumulative scores
-        if "fluency" not in cumulative_scores:
-            cumulative_scores = {"fluency": [], "grammar": [], "vocabulary": []}
-        
-        cumulative_scores["fluency"].append(analysis.get("fluency_score", 0))
-        cumulative_scores["grammar"].append(analysis.get("grammar_score", 0))
-        cumulative_scores["vocabulary"].append(analysis.get("vocabulary_score", 0))
+        # Update running score totals
+        for skill in SCORE_SKILLS:
+            totals = cumulative_scores[skill]
+            totals["sum"] += analysis.get(f"{skill}_score", 0)
+            totals["n"] += 1
         
         # Calculate averages
         avg_scores = {
-            "fluency": sum(cumulative_scores["fluency"]) / len(cumulative_scores["fluency"]),
-            "grammar": sum(cumulative_scores["grammar"]) / len(cumulative_scores["grammar"]),
-            "vocabulary": sum(cumulative_scores["vocabulary"]) / len(cumulative_scores["vocabulary"])
+            skill: totals["sum"] / totals["n"]
+            for skill, totals in cumulative_scores.items()
         }
         
-        with get_db_cursor() as cursor:
-            cursor.execute(
-                """UPDATE conversation_history 
-                   SET messages = %s, scores = %s
-                   WHERE id = %s""",
-                (json.dumps(messages), json.dumps(cumulative_scores), session_id)
-            )
+        # Store the turn before replying so the next request sees it
+        await run_in_threadpool(
+            _save_session, session_id, messages[saved_count:], cumulative_scores
+        )
         
         return {
             "session_id": session_id,
@@ -461,53 +654,10 @@ async def end_free_talk(
 ):
     """End free talk session and get final scores"""
     try:
-        with get_db_cursor() as cursor:
-            cursor.execute(
-                "SELECT messages, scores, created_at FROM conversation_history WHERE id = %s AND user_id = %s",
-                (session_id, current_user["user_id"])
-            )
-            session = cursor.fetchone()
-            
-            if not session:
-                raise HTTPException(status_code=404, detail="Session not found")
-            
-            messages = json.loads(session["messages"]) if session["messages"] else []
-            scores = json.loads(session["scores"]) if session["scores"] else {}
-            
-            # Calculate final scores
-            final_scores = {
-                "fluency": sum(scores.get("fluency", [0])) / max(len(scores.get("fluency", [1])), 1),
-                "grammar": sum(scores.get("grammar", [0])) / max(len(scores.get("grammar", [1])), 1),
-                "vocabulary": sum(scores.get("vocabulary", [0])) / max(len(scores.get("vocabulary", [1])), 1)
-            }
-            
-            # Calculate duration
-            start_time = session["created_at"]
-            duration = (datetime.now() - start_time).seconds if start_time else 0
-            
-            # Award XP
-            xp = XPCalculator.calculate_speaking_xp(
-                final_scores["fluency"],
-                final_scores["grammar"],
-                final_scores["vocabulary"],
-                duration
-            )
-            
-            cursor.execute(
-                "UPDATE users SET xp_total = xp_total + %s WHERE id = %s",
-                (xp, current_user["user_id"])
-            )
-            
-            user_messages = len([m for m in messages if not m["is_ai"]])
-            
-            return {
-                "session_id": session_id,
-                "duration_seconds": duration,
-                "message_count": user_messages,
-                "final_scores": final_scores,
-                "xp_earned": xp,
-                "summary": f"Great session! You exchanged {user_messages} messages over {duration // 60} minutes."
-            }
+        result = await run_in_threadpool(_finish_free_talk, session_id, current_user["user_id"])
+        # The caches aren't thread-safe; drop the user's entries back on the event loop
+        invalidate_user(current_user["user_id"])
+        return result
     except HTTPException:
         raise
     except Exception as e:
@@ -530,8 +680,7 @@ async def transcribe_audio(
                 detail="No AI service configured. Please add an API key in settings."
             )
         
-        audio_data = await audio.read()
-        result = await service.transcribe_audio(audio_data)
+        result = await service.transcribe_audio(audio.file)
         
         return result
     except HTTPException:
@@ -539,3 +688,68 @@ async def transcribe_audio(
     except Exception as e:
         logger.error(f"Transcribe error: {e}")
         raise HTTPException(status_code=500, detail="Failed to transcribe audio")
+
+
+@router.post("/tts")
+async def text_to_speech(
+    request: Request,
+    text: str = Form(...),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Synthesise speech for text, streaming it back as it is generated and storing
+    it under its content-addressed audio URL (sent as Content-Location).
+    Text that has been synthesised before redirects to that URL without an API call.
+    """
+    text = text.strip()
+    if not text or len(text) > TTS_MAX_CHARS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Text must be between 1 and {TTS_MAX_CHARS} characters"
+        )
+    
+    digest = hashlib.sha256(text.encode()).hexdigest()
+    path = _tts_audio_path(digest)
+    audio_url = str(request.url_for("get_tts_audio", digest=digest))
+    if os.path.isfile(path):
+        return RedirectResponse(audio_url, status_code=303)
+    
+    try:
+        service = await _get_speech_service(current_user["user_id"])
+        chunks = service.stream_text_to_speech(text)
+        # Wait for the first chunk so a missing key or provider error still
+        # gets a proper status instead of a truncated 200
+        first = await anext(chunks, None)
+        if first is None:
+            raise HTTPException(
+                status_code=400,
+                detail="Text-to-speech requires a working OpenAI API key in settings."
+            )
+        
+        return StreamingResponse(
+            _relay_and_store_tts(first, chunks, path),
+            media_type="audio/mpeg",
+            headers={"Content-Location": audio_url}
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Text-to-speech error: {e}")
+        raise HTTPException(status_code=500, detail="Failed to generate speech")
+
+
+@router.get("/tts/{digest}.mp3", name="get_tts_audio")
+async def get_tts_audio(digest: str):
+    """Serve stored speech audio; the URL is content-addressed, so it is cached as immutable"""
+    if len(digest) != 64 or not _HEX_DIGITS.issuperset(digest):
+        raise HTTPException(status_code=404, detail="Audio not found")
+    
+    path = _tts_audio_path(digest)
+    if not os.path.isfile(path):
+        raise HTTPException(status_code=404, detail="Audio not found")
+    
+    return FileResponse(
+        path,
+        media_type="audio/mpeg",
+        headers={"Cache-Control": TTS_CACHE_CONTROL}
+    )
@@ -2,17 +2,59 @@
 User Settings Router - UC16, UC17: Profile and API Key Management
 """
 from fastapi import APIRouter, HTTPException, Depends
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from typing import Optional, List
+import asyncio
 import logging
 
+import openai
+import google.generativeai as genai
+
 from utils.jwt_handler import get_current_user
-from utils.encryption import encrypt_api_key, decrypt_api_key, mask_api_key
+from utils.encryption import encrypt_api_key, decrypt_api_key, mask_api_key, fingerprint_api_key
 from database import get_db_cursor
+from utils.cache import invalidate_speech_service, invalidate_user
+from services.gemini_service import make_async_client
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+# Profile reads only do blocking DB work, so they are plain functions that
+# FastAPI runs in its threadpool instead of on the event loop. The API key
+# handlers and the profile update stay async: they also touch the in-process
+# TTL caches, which are not thread-safe and are otherwise only used from the loop.
+
+# Seconds allowed for the provider round trip when testing a key
+API_KEY_TEST_TIMEOUT = 5
+
+# Profile and API key statements, built once at import
+_SQL_PROFILE = """SELECT u.id, u.email, u.name, u.cefr_level, u.xp_total,
+                         u.current_streak, u.created_at,
+                         s.daily_goal_minutes, s.notifications_enabled,
+                         s.study_days, s.preferred_ai,
+                         s.openai_api_key IS NOT NULL as openai_configured,
+                         s.gemini_api_key IS NOT NULL as gemini_configured,
+                         s.openai_api_key_mask, s.gemini_api_key_mask
+                  FROM users u
+                  LEFT JOIN user_settings s ON s.user_id = u.id
+                  WHERE u.id = %s"""
+_SQL_UPDATE_API_KEYS = """UPDATE user_settings
+                          SET openai_api_key = IF(%(openai_clear)s, NULL,
+                                  IF(%(openai_fingerprint)s <=> openai_api_key_fingerprint, openai_api_key,
+                                     COALESCE(%(openai_key)s, openai_api_key))),
+                              openai_api_key_mask = IF(%(openai_clear)s, NULL, COALESCE(%(openai_mask)s, openai_api_key_mask)),
+                              openai_api_key_fingerprint = IF(%(openai_clear)s, NULL,
+                                  COALESCE(%(openai_fingerprint)s, openai_api_key_fingerprint)),
+                              gemini_api_key = IF(%(gemini_clear)s, NULL,
+                                  IF(%(gemini_fingerprint)s <=> gemini_api_key_fingerprint, gemini_api_key,
+                                     COALESCE(%(gemini_key)s, gemini_api_key))),
+                              gemini_api_key_mask = IF(%(gemini_clear)s, NULL, COALESCE(%(gemini_mask)s, gemini_api_key_mask)),
+                              gemini_api_key_fingerprint = IF(%(gemini_clear)s, NULL,
+                                  COALESCE(%(gemini_fingerprint)s, gemini_api_key_fingerprint)),
+                              preferred_ai = COALESCE(%(preferred_ai)s, preferred_ai)
+                          WHERE user_id = %(user_id)s"""
+
 
 class ProfileUpdate(BaseModel):
     name: Optional[str] = None
@@ -27,26 +69,21 @@ class APIKeyUpdate(BaseModel):
 
 
 @router.get("/profile")
-async def get_profile(current_user: dict = Depends(get_current_user)):
+def get_profile(current_user: dict = Depends(get_current_user)):
     """Get user profile and settings"""
     try:
         with get_db_cursor() as cursor:
-            cursor.execute(
-                """SELECT u.id, u.email, u.name, u.cefr_level, u.xp_total,
-                          u.current_streak, u.created_at,
-                          s.daily_goal_minutes, s.notifications_enabled,
-                          s.study_days, s.preferred_ai,
-                          s.openai_api_key, s.gemini_api_key
-                   FROM users u
-                   LEFT JOIN user_settings s ON s.user_id = u.id
-                   WHERE u.id = %s""",
-                (current_user["user_id"],)
-            )
+            cursor.execute(_SQL_PROFILE, (current_user["user_id"],))
             result = cursor.fetchone()
             
             if not result:
                 raise HTTPException(status_code=404, detail="User not found")
             
+            if (result["openai_configured"] and not result["openai_api_key_mask"]) or \
+                    (result["gemini_configured"] and not result["gemini_api_key_mask"]):
+                # Keys saved before masks were stored - mask once and persist
+                result.update(_backfill_masks(cursor, current_user["user_id"]))
+            
             return {
                 "id": result["id"],
                 "email": result["email"],
@@ -62,10 +99,10 @@ async def get_profile(current_user: dict = Depends(get_current_user)):
                     "preferred_ai": result["preferred_ai"] or "openai"
                 },
                 "api_keys": {
-                    "openai_configured": bool(result["openai_api_key"]),
-                    "openai_masked": mask_api_key(decrypt_api_key(result["openai_api_key"])) if result["openai_api_key"] else None,
-                    "gemini_configured": bool(result["gemini_api_key"]),
-                    "gemini_masked": mask_api_key(decrypt_api_key(result["gemini_api_key"])) if result["gemini_api_key"] else None
+                    "openai_configured": bool(result["openai_configured"]),
+                    "openai_masked": result["openai_api_key_mask"] if result["openai_configured"] else None,
+                    "gemini_configured": bool(result["gemini_configured"]),
+                    "gemini_masked": result["gemini_api_key_mask"] if result["gemini_configured"] else None
                 }
             }
     except HTTPException:
@@ -75,6 +112,26 @@ async def get_profile(current_user: dict = Depends(get_current_user)):
         raise HTTPException(status_code=500, detail="Failed to load profile")
 
 
+def _save_profile(user_id: int, update: ProfileUpdate):
+    """Write the profile fields that were sent"""
+    with get_db_cursor() as cursor:
+        if update.name:
+            cursor.execute(
+                "UPDATE users SET name = %s WHERE id = %s",
+                (update.name, user_id)
+            )
+        
+        # Update settings - one fixed statement, NULL leaves a column unchanged
+        if update.daily_goal_minutes is not None or update.notifications_enabled is not None:
+            cursor.execute(
+                """UPDATE user_settings
+                   SET daily_goal_minutes = COALESCE(%s, daily_goal_minutes),
+                       notifications_enabled = COALESCE(%s, notifications_enabled)
+                   WHERE user_id = %s""",
+                (update.daily_goal_minutes, update.notifications_enabled, user_id)
+            )
+
+
 @router.put("/profile")
 async def update_profile(
     update: ProfileUpdate,
@@ -85,33 +142,10 @@ async def update_profile(
     FR27: Allow profile updates
     """
     try:
-        with get_db_cursor() as cursor:
-            if update.name:
-                cursor.execute(
-                    "UPDATE users SET name = %s WHERE id = %s",
-                    (update.name, current_user["user_id"])
-                )
-            
-            # Update settings
-            updates = []
-            values = []
-            
-            if update.daily_goal_minutes is not None:
-                updates.append("daily_goal_minutes = %s")
-                values.append(update.daily_goal_minutes)
-            
-            if update.notifications_enabled is not None:
-                updates.append("notifications_enabled = %s")
-                values.append(update.notifications_enabled)
-            
-            if updates:
-                values.append(current_user["user_id"])
-                cursor.execute(
-                    f"UPDATE user_settings SET {', '.join(updates)} WHERE user_id = %s",
-                    tuple(values)
-                )
-            
-            return {"success": True, "message": "Profile updated successfully"}
+        await run_in_threadpool(_save_profile, current_user["user_id"], update)
+        # The cached dashboard shows the user's name
+        invalidate_user(current_user["user_id"])
+        return {"success": True, "message": "Profile updated successfully"}
     except Exception as e:
         logger.error(f"Update profile error: {e}")
         raise HTTPException(status_code=500, detail="Failed to update profile")
@@ -128,41 +162,34 @@ async def update_api_keys(
     """
     try:
         with get_db_cursor() as cursor:
-            updates = []
-            values = []
-            
-            if update.openai_api_key is not None:
-                if update.openai_api_key == "":
-                    updates.append("openai_api_key = NULL")
-                else:
-                    updates.append("openai_api_key = %s")
-                    values.append(encrypt_api_key(update.openai_api_key))
-            
-            if update.gemini_api_key is not None:
-                if update.gemini_api_key == "":
-                    updates.append("gemini_api_key = NULL")
-                else:
-                    updates.append("gemini_api_key = %s")
-                    values.append(encrypt_api_key(update.gemini_api_key))
-            
-            if update.preferred_ai is not None:
-                if update.preferred_ai in ["openai", "gemini"]:
-                    updates.append("preferred_ai = %s")
-                    values.append(update.preferred_ai)
-            
-            if updates:
-                values.append(current_user["user_id"])
-                cursor.execute(
-                    f"UPDATE user_settings SET {', '.join(updates)} WHERE user_id = %s",
-                    tuple(values)
-                )
+            preferred_ai = update.preferred_ai if update.preferred_ai in ("openai", "gemini") else None
+            changed = update.openai_api_key is not None or update.gemini_api_key is not None or preferred_ai
             
-            return {
-                "success": True,
-                "message": "API keys updated successfully",
-                "openai_configured": update.openai_api_key is not None and update.openai_api_key != "",
-                "gemini_configured": update.gemini_api_key is not None and update.gemini_api_key != ""
-            }
+            if changed:
+                # One fixed statement: per key, clear it ("" sent), set it, or
+                # leave it unchanged (NULL params fall through to COALESCE).
+                # A key whose fingerprint matches the stored one keeps its
+                # ciphertext, so resubmitting a key leaves the row untouched.
+                # SET runs left to right - fingerprints are compared before
+                # being overwritten.
+                params = {
+                    **_key_update_params("openai", update.openai_api_key),
+                    **_key_update_params("gemini", update.gemini_api_key),
+                    "preferred_ai": preferred_ai,
+                    "user_id": current_user["user_id"]
+                }
+                cursor.execute(_SQL_UPDATE_API_KEYS, params)
+        
+        # After the commit, so a concurrent speaking request can't rebuild and
+        # re-cache the service from the old keys
+        if changed:
+            invalidate_speech_service(current_user["user_id"])
+        return {
+            "success": True,
+            "message": "API keys updated successfully",
+            "openai_configured": update.openai_api_key is not None and update.openai_api_key != "",
+            "gemini_configured": update.gemini_api_key is not None and update.gemini_api_key != ""
+        }
     except Exception as e:
         logger.error(f"Update API keys error: {e}")
         raise HTTPException(status_code=500, detail="Failed to update API keys")
@@ -175,46 +202,41 @@ async def test_api_key(
 ):
     """Test if an API key is working"""
     try:
-        with get_db_cursor() as cursor:
-            cursor.execute(
-                "SELECT openai_api_key, gemini_api_key FROM user_settings WHERE user_id = %s",
-                (current_user["user_id"],)
-            )
-            settings = cursor.fetchone()
-            
-            if not settings:
-                return {"success": False, "error": "No settings found"}
-            
-            if provider == "openai":
-                key = decrypt_api_key(settings["openai_api_key"]) if settings["openai_api_key"] else None
-                if not key:
-                    return {"success": False, "error": "OpenAI API key not configured"}
-                
-                # Test the key
-                import openai
-                try:
-                    client = openai.OpenAI(api_key=key)
-                    client.models.list()
-                    return {"success": True, "message": "OpenAI API key is valid"}
-                except Exception as e:
-                    return {"success": False, "error": f"OpenAI API error: {str(e)}"}
+        settings = await run_in_threadpool(_load_api_keys, current_user["user_id"])
+        
+        if not settings:
+            return {"success": False, "error": "No settings found"}
+        
+        # The OpenAI SDK call is blocking - run it off the event loop
+        if provider == "openai":
+            key = decrypt_api_key(settings["openai_api_key"]) if settings["openai_api_key"] else None
+            if not key:
+                return {"success": False, "error": "OpenAI API key not configured"}
             
-            elif provider == "gemini":
-                key = decrypt_api_key(settings["gemini_api_key"]) if settings["gemini_api_key"] else None
-                if not key:
-                    return {"success": False, "error": "Gemini API key not configured"}
-                
-                # Test the key
-                import google.generativeai as genai
-                try:
-                    genai.configure(api_key=key)
-                    model = genai.GenerativeModel('gemini-pro')
-                    model.generate_content("Hello")
-                    return {"success": True, "message": "Gemini API key is valid"}
-                except Exception as e:
-                    return {"success": False, "error": f"Gemini API error: {str(e)}"}
+            try:
+                await asyncio.wait_for(
+                    run_in_threadpool(_test_openai_key, key), API_KEY_TEST_TIMEOUT
+                )
+                return {"success": True, "message": "OpenAI API key is valid"}
+            except asyncio.TimeoutError:
+                return {"success": False, "error": "OpenAI API error: request timed out"}
+            except Exception as e:
+                return {"success": False, "error": f"OpenAI API error: {str(e)}"}
+        
+        elif provider == "gemini":
+            key = decrypt_api_key(settings["gemini_api_key"]) if settings["gemini_api_key"] else None
+            if not key:
+                return {"success": False, "error": "Gemini API key not configured"}
             
-            return {"success": False, "error": "Invalid provider"}
+            try:
+                await asyncio.wait_for(_test_gemini_key(key), API_KEY_TEST_TIMEOUT)
+                return {"success": True, "message": "Gemini API key is valid"}
+            except asyncio.TimeoutError:
+                return {"success": False, "error": "Gemini API error: request timed out"}
+            except Exception as e:
+                return {"success": False, "error": f"Gemini API error: {str(e)}"}
+        
+        return {"success": False, "error": "Invalid provider"}
     except Exception as e:
         logger.error(f"Test API key error: {e}")
         raise HTTPException(status_code=500, detail="Failed to test API key")
@@ -230,20 +252,97 @@ async def delete_api_key(
         with get_db_cursor() as cursor:
             if provider == "openai":
                 cursor.execute(
-                    "UPDATE user_settings SET openai_api_key = NULL WHERE user_id = %s",
+                    """UPDATE user_settings
+                       SET openai_api_key = NULL, openai_api_key_mask = NULL, openai_api_key_fingerprint = NULL
+                       WHERE user_id = %s""",
                     (current_user["user_id"],)
                 )
             elif provider == "gemini":
                 cursor.execute(
-                    "UPDATE user_settings SET gemini_api_key = NULL WHERE user_id = %s",
+                    """UPDATE user_settings
+                       SET gemini_api_key = NULL, gemini_api_key_mask = NULL, gemini_api_key_fingerprint = NULL
+                       WHERE user_id = %s""",
                     (current_user["user_id"],)
                 )
             else:
                 raise HTTPException(status_code=400, detail="Invalid provider")
-            
-            return {"success": True, "message": f"{provider.title()} API key removed"}
+        
+        invalidate_speech_service(current_user["user_id"])
+        return {
+            "success": True,
+            "message": f"{provider.title()} API key removed"
+        }
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"Delete API key error: {e}")
         raise HTTPException(status_code=500, detail="Failed to delete API key")
+
+
+def _key_update_params(provider: str, api_key: Optional[str]) -> dict:
+    """Named clear/key/mask/fingerprint parameters for one provider's key in update_api_keys"""
+    if not api_key:
+        return {
+            f"{provider}_clear": api_key == "",
+            f"{provider}_key": None,
+            f"{provider}_mask": None,
+            f"{provider}_fingerprint": None
+        }
+    return {
+        f"{provider}_clear": False,
+        f"{provider}_key": encrypt_api_key(api_key),
+        f"{provider}_mask": mask_api_key(api_key),
+        f"{provider}_fingerprint": fingerprint_api_key(api_key)
+    }
+
+
+def _load_api_keys(user_id: int) -> Optional[dict]:
+    """Read the user's encrypted keys (the connection is released before any provider call)"""
+    with get_db_cursor() as cursor:
+        cursor.execute(
+            "SELECT openai_api_key, gemini_api_key FROM user_settings WHERE user_id = %s",
+            (user_id,)
+        )
+        return cursor.fetchone()
+
+
+def _test_openai_key(key: str):
+    """Make a cheap authenticated OpenAI call (raises if the key is rejected)"""
+    client = openai.OpenAI(api_key=key, timeout=API_KEY_TEST_TIMEOUT, max_retries=0)
+    client.models.list()
+
+
+async def _test_gemini_key(key: str):
+    """
+    Make a minimal Gemini call (raises if the key is rejected). Async on a client
+    bound to key, so a timeout cancels the request itself and the process-wide
+    genai.configure() key is left alone.
+    """
+    client = make_async_client(key)
+    model = genai.GenerativeModel('gemini-pro')
+    model._async_client = client
+    try:
+        await model.generate_content_async(
+            "Hello", request_options={"timeout": API_KEY_TEST_TIMEOUT}
+        )
+    finally:
+        await client.transport.close()
+
+
+def _backfill_masks(cursor, user_id: int) -> dict:
+    """Compute and store the display masks for keys saved without one"""
+    cursor.execute(
+        "SELECT openai_api_key, gemini_api_key FROM user_settings WHERE user_id = %s",
+        (user_id,)
+    )
+    row = cursor.fetchone()
+    masks = {
+        "openai_api_key_mask": mask_api_key(decrypt_api_key(row["openai_api_key"])) if row["openai_api_key"] else None,
+        "gemini_api_key_mask": mask_api_key(decrypt_api_key(row["gemini_api_key"])) if row["gemini_api_key"] else None
+    }
+    cursor.execute(
+        """UPDATE user_settings SET openai_api_key_mask = %s, gemini_api_key_mask = %s
+           WHERE user_id = %s""",
+        (masks["openai_api_key_mask"], masks["gemini_api_key_mask"], user_id)
+    )
+    return masks
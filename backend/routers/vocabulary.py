@@ -2,79 +2,149 @@
 Vocabulary Router - UC11: Vocabulary Advisor
 """
 from fastapi import APIRouter, HTTPException, Depends
-from typing import List, Optional
+from fastapi.concurrency import run_in_threadpool
+from typing import List, Optional, Set
 from datetime import datetime
-import json
+from itertools import islice
+import orjson
+import random
 import logging
 
 from utils.jwt_handler import get_current_user
+from utils.cache import invalidate_user
 from database import get_db_cursor
 from services.ai_engine import AIAdaptiveEngine
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+# Read handlers only do blocking DB work, so they are plain functions that
+# FastAPI runs in its threadpool instead of on the event loop. Write handlers
+# are async: the list feeds the dashboard's review count, and the cached
+# dashboard is dropped from the loop (the TTL caches aren't thread-safe)
+# once the write has committed in the threadpool.
+
+PRACTICE_SIZE = 10
+# Top words fetched for a practice set; ties on mistake_count are shuffled
+# in Python rather than with ORDER BY RAND(), which sorts every word
+PRACTICE_CANDIDATES = 50
+
+# Level-appropriate words offered when the review list is short
+_VOCAB_BY_LEVEL = {
+    "A1": (
+        {"word": "hello", "suggestion": True, "meaning": "greeting"},
+        {"word": "goodbye", "suggestion": True, "meaning": "farewell"},
+        {"word": "please", "suggestion": True, "meaning": "polite request"},
+        {"word": "thank you", "suggestion": True, "meaning": "expression of gratitude"},
+        {"word": "water", "suggestion": True, "meaning": "liquid for drinking"},
+        {"word": "food", "suggestion": True, "meaning": "something to eat"},
+        {"word": "house", "suggestion": True, "meaning": "place to live"},
+        {"word": "family", "suggestion": True, "meaning": "relatives"},
+        {"word": "friend", "suggestion": True, "meaning": "close companion"},
+        {"word": "work", "suggestion": True, "meaning": "job or employment"}
+    ),
+    "A2": (
+        {"word": "appointment", "suggestion": True, "meaning": "scheduled meeting"},
+        {"word": "experience", "suggestion": True, "meaning": "knowledge from doing"},
+        {"word": "opportunity", "suggestion": True, "meaning": "favorable chance"},
+        {"word": "suggest", "suggestion": True, "meaning": "propose an idea"},
+        {"word": "improve", "suggestion": True, "meaning": "make better"}
+    ),
+    "B1": (
+        {"word": "accomplish", "suggestion": True, "meaning": "achieve or complete"},
+        {"word": "consequence", "suggestion": True, "meaning": "result of an action"},
+        {"word": "efficient", "suggestion": True, "meaning": "working well"},
+        {"word": "inevitable", "suggestion": True, "meaning": "certain to happen"},
+        {"word": "perspective", "suggestion": True, "meaning": "point of view"}
+    ),
+    "B2": (
+        {"word": "ambiguous", "suggestion": True, "meaning": "having multiple meanings"},
+        {"word": "comprehensive", "suggestion": True, "meaning": "complete and thorough"},
+        {"word": "deteriorate", "suggestion": True, "meaning": "become worse"},
+        {"word": "elaborate", "suggestion": True, "meaning": "detailed and complex"},
+        {"word": "fluctuate", "suggestion": True, "meaning": "vary irregularly"}
+    ),
+    "C1": (
+        {"word": "ubiquitous", "suggestion": True, "meaning": "present everywhere"},
+        {"word": "pragmatic", "suggestion": True, "meaning": "practical approach"},
+        {"word": "nuance", "suggestion": True, "meaning": "subtle difference"},
+        {"word": "meticulous", "suggestion": True, "meaning": "very careful and precise"},
+        {"word": "eloquent", "suggestion": True, "meaning": "fluent and persuasive"}
+    )
+}
+
+# Word set per level, for the candidate lookup and a quick "none mastered" check
+_LEVEL_WORDSETS = {
+    level: frozenset(w["word"] for w in words)
+    for level, words in _VOCAB_BY_LEVEL.items()
+}
+
+# Fixed statement texts for the per-request reads; the advisor returns the
+# user row once per top mistake (one row with NULL word columns if none)
+_SQL_ADVISOR = """SELECT u.cefr_level,
+                         (SELECT COUNT(*) FROM vocabulary_lists
+                          WHERE user_id = u.id AND mastered = TRUE) as mastered_count,
+                         v.word, v.question, v.correct_answer, v.mistake_count, v.created_at
+                  FROM users u
+                  LEFT JOIN (
+                      SELECT word, question, correct_answer, mistake_count, created_at
+                      FROM vocabulary_lists
+                      WHERE user_id = %s AND mastered = FALSE
+                      ORDER BY mistake_count DESC, created_at DESC
+                      LIMIT 20
+                  ) v ON 1 = 1
+                  WHERE u.id = %s
+                  ORDER BY v.mistake_count DESC, v.created_at DESC"""
+_SQL_PRACTICE_WORDS = """SELECT word, meaning, context, correct_answer, mistake_count
+                         FROM vocabulary_lists 
+                         WHERE user_id = %s AND mastered = FALSE
+                         ORDER BY mistake_count DESC
+                         LIMIT %s"""
+
 
 @router.get("/advisor")
-async def get_vocabulary_advisor(current_user: dict = Depends(get_current_user)):
+def get_vocabulary_advisor(current_user: dict = Depends(get_current_user)):
     """
     Get personalized vocabulary list based on mistakes
     FR16: AI-generated vocabulary advisor list
     """
     try:
         with get_db_cursor() as cursor:
-            # Get user's mistakes from vocabulary_lists table
-            cursor.execute(
-                """SELECT word, translation, mistake_count, mastered, created_at
-                   FROM vocabulary_lists 
-                   WHERE user_id = %s AND mastered = FALSE
-                   ORDER BY mistake_count DESC, created_at DESC
-                   LIMIT 20""",
-                (current_user["user_id"],)
-            )
-            mistakes = cursor.fetchall()
-            
-            # Get mastered words
-            cursor.execute(
-                """SELECT word FROM vocabulary_lists 
-                   WHERE user_id = %s AND mastered = TRUE""",
-                (current_user["user_id"],)
-            )
-            mastered = [row["word"] for row in cursor.fetchall()]
-            
-            # Get user's level for context
-            cursor.execute(
-                "SELECT cefr_level FROM users WHERE id = %s",
-                (current_user["user_id"],)
-            )
-            user = cursor.fetchone()
+            # User's level, mastered count and top mistakes in one round trip
+            cursor.execute(_SQL_ADVISOR, (current_user["user_id"], current_user["user_id"]))
+            rows = cursor.fetchall()
+            user = rows[0]
+            mistakes = [row for row in rows if row["word"] is not None]
             
             # Generate recommendations
             word_list = []
             for mistake in mistakes:
-                translation_data = {}
-                try:
-                    translation_data = json.loads(mistake["translation"]) if mistake["translation"] else {}
-                except:
-                    translation_data = {"meaning": mistake["translation"]}
-                
                 word_list.append({
                     "word": mistake["word"],
                     "mistake_count": mistake["mistake_count"],
-                    "context": translation_data.get("question", ""),
-                    "correct_answer": translation_data.get("correct_answer", ""),
+                    "context": mistake["question"] or "",
+                    "correct_answer": mistake["correct_answer"] or "",
                     "last_seen": mistake["created_at"].isoformat() if mistake["created_at"] else None
                 })
             
             # Add suggested words based on level if list is short
             if len(word_list) < 10:
-                suggested = _get_suggested_vocabulary(user["cefr_level"] or "A1", mastered)
-                word_list.extend(suggested[:10 - len(word_list)])
+                level = user["cefr_level"] if user["cefr_level"] in _VOCAB_BY_LEVEL else "A1"
+                # Only the candidate words need checking against the mastered list
+                candidates = tuple(_LEVEL_WORDSETS[level])
+                cursor.execute(
+                    f"""SELECT word FROM vocabulary_lists
+                        WHERE user_id = %s AND mastered = TRUE
+                          AND word IN ({', '.join(['%s'] * len(candidates))})""",
+                    (current_user["user_id"], *candidates)
+                )
+                mastered = {row["word"] for row in cursor.fetchall()}
+                word_list.extend(_get_suggested_vocabulary(level, mastered, 10 - len(word_list)))
             
             return {
                 "user_level": user["cefr_level"],
                 "words_to_review": len(word_list),
-                "mastered_count": len(mastered),
+                "mastered_count": user["mastered_count"],
                 "vocabulary_list": word_list,
                 "tip": "Review these words regularly to improve your vocabulary!"
             }
@@ -83,6 +153,46 @@ async def get_vocabulary_advisor(current_user: dict = Depends(get_current_user))
         raise HTTPException(status_code=500, detail="Failed to load vocabulary advisor")
 
 
+def _add_word(user_id: int, word: str, translation: Optional[str], context: Optional[str]):
+    """Insert a word into the user's list, keeping any stored translation"""
+    with get_db_cursor() as cursor:
+        cursor.execute(
+            """INSERT INTO vocabulary_lists 
+               (user_id, word, translation, mistake_count, mastered, created_at)
+               VALUES (%s, %s, %s, 0, FALSE, %s)
+               ON DUPLICATE KEY UPDATE 
+               translation = COALESCE(VALUES(translation), translation)""",
+            (
+                user_id,
+                word.lower().strip(),
+                orjson.dumps({"meaning": translation, "context": context}).decode(),
+                datetime.now()
+            )
+        )
+
+
+def _mark_word_mastered(user_id: int, word: str) -> int:
+    """Mark a word as mastered and return the number of rows matched"""
+    with get_db_cursor() as cursor:
+        cursor.execute(
+            """UPDATE vocabulary_lists 
+               SET mastered = TRUE 
+               WHERE user_id = %s AND word = %s""",
+            (user_id, word.lower().strip())
+        )
+        return cursor.rowcount
+
+
+def _remove_word(user_id: int, word: str):
+    """Delete a word from the user's list"""
+    with get_db_cursor() as cursor:
+        cursor.execute(
+            """DELETE FROM vocabulary_lists 
+               WHERE user_id = %s AND word = %s""",
+            (user_id, word.lower().strip())
+        )
+
+
 @router.post("/add")
 async def add_vocabulary(
     word: str,
@@ -92,22 +202,9 @@ async def add_vocabulary(
 ):
     """Add a word to user's vocabulary list"""
     try:
-        with get_db_cursor() as cursor:
-            cursor.execute(
-                """INSERT INTO vocabulary_lists 
-                   (user_id, word, translation, mistake_count, mastered, created_at)
-                   VALUES (%s, %s, %s, 0, FALSE, %s)
-                   ON DUPLICATE KEY UPDATE 
-                   translation = COALESCE(VALUES(translation), translation)""",
-                (
-                    current_user["user_id"],
-                    word.lower().strip(),
-                    json.dumps({"meaning": translation, "context": context}),
-                    datetime.now()
-                )
-            )
-            
-            return {"success": True, "message": f"Added '{word}' to your vocabulary list"}
+        await run_in_threadpool(_add_word, current_user["user_id"], word, translation, context)
+        invalidate_user(current_user["user_id"])
+        return {"success": True, "message": f"Added '{word}' to your vocabulary list"}
     except Exception as e:
         logger.error(f"Add vocabulary error: {e}")
         raise HTTPException(status_code=500, detail="Failed to add word")
@@ -120,18 +217,11 @@ async def mark_word_mastered(
 ):
     """Mark a word as mastered"""
     try:
-        with get_db_cursor() as cursor:
-            cursor.execute(
-                """UPDATE vocabulary_lists 
-                   SET mastered = TRUE 
-                   WHERE user_id = %s AND word = %s""",
-                (current_user["user_id"], word.lower().strip())
-            )
-            
-            if cursor.rowcount == 0:
-                raise HTTPException(status_code=404, detail="Word not found in your list")
-            
-            return {"success": True, "message": f"Marked '{word}' as mastered!"}
+        if not await run_in_threadpool(_mark_word_mastered, current_user["user_id"], word):
+            raise HTTPException(status_code=404, detail="Word not found in your list")
+        
+        invalidate_user(current_user["user_id"])
+        return {"success": True, "message": f"Marked '{word}' as mastered!"}
     except HTTPException:
         raise
     except Exception as e:
@@ -146,34 +236,24 @@ async def remove_vocabulary(
 ):
     """Remove a word from vocabulary list"""
     try:
-        with get_db_cursor() as cursor:
-            cursor.execute(
-                """DELETE FROM vocabulary_lists 
-                   WHERE user_id = %s AND word = %s""",
-                (current_user["user_id"], word.lower().strip())
-            )
-            
-            return {"success": True, "message": f"Removed '{word}' from your list"}
+        await run_in_threadpool(_remove_word, current_user["user_id"], word)
+        invalidate_user(current_user["user_id"])
+        return {"success": True, "message": f"Removed '{word}' from your list"}
     except Exception as e:
         logger.error(f"Remove vocabulary error: {e}")
         raise HTTPException(status_code=500, detail="Failed to remove word")
 
 
 @router.get("/practice")
-async def get_vocabulary_practice(current_user: dict = Depends(get_current_user)):
+def get_vocabulary_practice(current_user: dict = Depends(get_current_user)):
     """Get vocabulary practice questions"""
     try:
         with get_db_cursor() as cursor:
             # Get words to practice (not mastered, prioritize high mistake count)
-            cursor.execute(
-                """SELECT word, translation, mistake_count
-                   FROM vocabulary_lists 
-                   WHERE user_id = %s AND mastered = FALSE
-                   ORDER BY mistake_count DESC, RAND()
-                   LIMIT 10""",
-                (current_user["user_id"],)
-            )
+            cursor.execute(_SQL_PRACTICE_WORDS, (current_user["user_id"], PRACTICE_CANDIDATES))
             words = cursor.fetchall()
+            words.sort(key=lambda w: (-(w["mistake_count"] or 0), random.random()))
+            words = words[:PRACTICE_SIZE]
             
             if not words:
                 return {
@@ -184,17 +264,11 @@ async def get_vocabulary_practice(current_user: dict = Depends(get_current_user)
             # Generate practice questions
             questions = []
             for word in words:
-                translation_data = {}
-                try:
-                    translation_data = json.loads(word["translation"]) if word["translation"] else {}
-                except:
-                    pass
-                
                 questions.append({
                     "type": "vocabulary_recall",
                     "word": word["word"],
-                    "hint": translation_data.get("context", ""),
-                    "correct_answer": translation_data.get("correct_answer", translation_data.get("meaning", ""))
+                    "hint": word["context"] or "",
+                    "correct_answer": word["correct_answer"] if word["correct_answer"] is not None else (word["meaning"] or "")
                 })
             
             return {
@@ -206,50 +280,11 @@ async def get_vocabulary_practice(current_user: dict = Depends(get_current_user)
         raise HTTPException(status_code=500, detail="Failed to load practice")
 
 
-def _get_suggested_vocabulary(level: str, mastered: List[str]) -> List[dict]:
-    """Get suggested vocabulary words for a level"""
-    vocabulary_by_level = {
-        "A1": [
-            {"word": "hello", "suggestion": True, "meaning": "greeting"},
-            {"word": "goodbye", "suggestion": True, "meaning": "farewell"},
-            {"word": "please", "suggestion": True, "meaning": "polite request"},
-            {"word": "thank you", "suggestion": True, "meaning": "expression of gratitude"},
-            {"word": "water", "suggestion": True, "meaning": "liquid for drinking"},
-            {"word": "food", "suggestion": True, "meaning": "something to eat"},
-            {"word": "house", "suggestion": True, "meaning": "place to live"},
-            {"word": "family", "suggestion": True, "meaning": "relatives"},
-            {"word": "friend", "suggestion": True, "meaning": "close companion"},
-            {"word": "work", "suggestion": True, "meaning": "job or employment"}
-        ],
-        "A2": [
-            {"word": "appointment", "suggestion": True, "meaning": "scheduled meeting"},
-            {"word": "experience", "suggestion": True, "meaning": "knowledge from doing"},
-            {"word": "opportunity", "suggestion": True, "meaning": "favorable chance"},
-            {"word": "suggest", "suggestion": True, "meaning": "propose an idea"},
-            {"word": "improve", "suggestion": True, "meaning": "make better"}
-        ],
-        "B1": [
-            {"word": "accomplish", "suggestion": True, "meaning": "achieve or complete"},
-            {"word": "consequence", "suggestion": True, "meaning": "result of an action"},
-            {"word": "efficient", "suggestion": True, "meaning": "working well"},
-            {"word": "inevitable", "suggestion": True, "meaning": "certain to happen"},
-            {"word": "perspective", "suggestion": True, "meaning": "point of view"}
-        ],
-        "B2": [
-            {"word": "ambiguous", "suggestion": True, "meaning": "having multiple meanings"},
-            {"word": "comprehensive", "suggestion": True, "meaning": "complete and thorough"},
-            {"word": "deteriorate", "suggestion": True, "meaning": "become worse"},
-            {"word": "elaborate", "suggestion": True, "meaning": "detailed and complex"},
-            {"word": "fluctuate", "suggestion": True, "meaning": "vary irregularly"}
-        ],
-        "C1": [
-            {"word": "ubiquitous", "suggestion": True, "meaning": "present everywhere"},
-            {"word": "pragmatic", "suggestion": True, "meaning": "practical approach"},
-            {"word": "nuance", "suggestion": True, "meaning": "subtle difference"},
-            {"word": "meticulous", "suggestion": True, "meaning": "very careful and precise"},
-            {"word": "eloquent", "suggestion": True, "meaning": "fluent and persuasive"}
-        ]
-    }
-    
-    suggested = vocabulary_by_level.get(level, vocabulary_by_level["A1"])
-    return [w for w in suggested if w["word"] not in mastered]
+def _get_suggested_vocabulary(level: str, mastered: Set[str], limit: int) -> List[dict]:
+    """Get up to `limit` suggested vocabulary words for a level, skipping mastered ones"""
+    if level not in _VOCAB_BY_LEVEL:
+        level = "A1"
+    suggested = _VOCAB_BY_LEVEL[level]
+    if _LEVEL_WORDSETS[level].isdisjoint(mastered):
+        return list(suggested[:limit])
+    return list(islice((w for w in suggested if w["word"] not in mastered), limit))
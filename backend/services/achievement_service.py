@@ -7,9 +7,29 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+# Available achievements and their conditions, checked in order. Each predicate
+# takes (total_lessons, xp_total, current_streak, score, activity_type)
+_ACHIEVEMENT_CHECKS = (
+    ("first_lesson", lambda lessons, xp, streak, score, kind: lessons >= 1),
+    ("xp_100", lambda lessons, xp, streak, score, kind: xp >= 100),
+    ("xp_500", lambda lessons, xp, streak, score, kind: xp >= 500),
+    ("xp_1000", lambda lessons, xp, streak, score, kind: xp >= 1000),
+    ("streak_3", lambda lessons, xp, streak, score, kind: streak >= 3),
+    ("streak_7", lambda lessons, xp, streak, score, kind: streak >= 7),
+    ("streak_30", lambda lessons, xp, streak, score, kind: streak >= 30),
+    ("perfect_lesson", lambda lessons, xp, streak, score, kind: score == 100),
+    ("first_speaking", lambda lessons, xp, streak, score, kind: kind == "speaking"),
+)
+
+# SQL issued on every check, defined once
+_SQL_EXISTING_BADGES = "SELECT badge_type FROM achievements WHERE user_id = %s"
+_SQL_INSERT_ACHIEVEMENT = """INSERT IGNORE INTO achievements (user_id, badge_type, earned_at)
+                             VALUES (%s, %s, %s)"""
+
+
 class AchievementService:
     @staticmethod
-    def check_achievements(cursor, user_id, current_stats, new_activity):
+    def check_achievements(cursor, user_id, current_stats, new_activity, existing_badges=None):
         """
         Check and award achievements based on user stats and recent activity.
         
@@ -18,71 +38,50 @@ class AchievementService:
             user_id: User ID
             current_stats: Dict containing user stats (xp_total, current_streak, etc.)
             new_activity: Dict containing details of the new activity (e.g., lesson completed)
+            existing_badges: Optional set of badge types the user already has,
+                when the caller fetched them with its own queries
             
         Returns:
-            List of newly awarded achievements
+            List of newly awarded achievements; the caller drops the user's
+            cached responses (invalidate_user) after committing
         """
-        new_awards = []
-        
-        # Define all available achievements and their conditions
-        # Lambda functions return True if condition is met
-        achievements = {
-            "first_lesson": {
-                "check": lambda s, a: s.get("total_lessons", 0) >= 1,
-                "type": "lesson"
-            },
-            "xp_100": {
-                "check": lambda s, a: s.get("xp_total", 0) >= 100,
-                "type": "xp"
-            },
-            "xp_500": {
-                "check": lambda s, a: s.get("xp_total", 0) >= 500,
-                "type": "xp"
-            },
-            "xp_1000": {
-                "check": lambda s, a: s.get("xp_total", 0) >= 1000,
-                "type": "xp"
-            },
-            "streak_3": {
-                "check": lambda s, a: s.get("current_streak", 0) >= 3,
-                "type": "streak"
-            },
-            "streak_7": {
-                "check": lambda s, a: s.get("current_streak", 0) >= 7,
-                "type": "streak"
-            },
-            "streak_30": {
-                "check": lambda s, a: s.get("current_streak", 0) >= 30,
-                "type": "streak"
-            },
-            "perfect_lesson": {
-                "check": lambda s, a: a.get("score", 0) == 100,
-                "type": "performance"
-            },
-            "first_speaking": {
-                "check": lambda s, a: a.get("type") == "speaking",
-                "type": "lesson"
-            }
-        }
+        # Pull the inputs out once rather than per predicate
+        facts = (
+            current_stats.get("total_lessons", 0),
+            current_stats.get("xp_total", 0),
+            current_stats.get("current_streak", 0),
+            new_activity.get("score", 0),
+            new_activity.get("type"),
+        )
+        # Every met condition is a candidate: XP and streaks also grow outside
+        # this check (speaking, review), so a threshold crossed there is only
+        # awarded here, on a later call
+        candidates = [
+            badge_type for badge_type, check in _ACHIEVEMENT_CHECKS
+            if check(*facts)
+        ]
+        if not candidates:
+            return []
         
         # Get existing achievements to avoid duplicates
-        cursor.execute(
-            "SELECT badge_type FROM achievements WHERE user_id = %s",
-            (user_id,)
-        )
-        existing_badges = {row["badge_type"] for row in cursor.fetchall()}
+        if existing_badges is None:
+            cursor.execute(_SQL_EXISTING_BADGES, (user_id,))
+            existing_badges = {row["badge_type"] for row in cursor.fetchall()}
         
-        # Check each achievement
-        for badge_type, criteria in achievements.items():
+        new_awards = []
+        for badge_type in candidates:
             if badge_type not in existing_badges:
-                if criteria["check"](current_stats, new_activity):
-                    # Award key achievement
-                    logger.info(f"Awarding achievement {badge_type} to user {user_id}")
-                    cursor.execute(
-                        """INSERT INTO achievements (user_id, badge_type, earned_at)
-                           VALUES (%s, %s, %s)""",
-                        (user_id, badge_type, datetime.now())
-                    )
-                    new_awards.append(badge_type)
+                logger.info(f"Awarding achievement {badge_type} to user {user_id}")
+                new_awards.append(badge_type)
+        
+        if new_awards:
+            # executemany sends a single multi-row INSERT; IGNORE skips badges a
+            # concurrent submission has just awarded (unique_user_badge) instead
+            # of failing - and rolling back - the whole submission
+            now = datetime.now()
+            cursor.executemany(
+                _SQL_INSERT_ACHIEVEMENT,
+                [(user_id, badge_type, now) for badge_type in new_awards]
+            )
         
         return new_awards
@@ -4,11 +4,44 @@ Handles content adaptation based on student performance
 """
 from typing import Dict, List, Optional, Any
 from datetime import datetime, timedelta
+from collections import Counter
+from dataclasses import dataclass
+from operator import itemgetter
+import bisect
+import heapq
+import statistics
 import json
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Skill weights for overall level calculation, as (skill, weight) pairs
+_SKILL_WEIGHT_PAIRS = (
+    ("grammar", 0.25),
+    ("vocabulary", 0.25),
+    ("pronunciation", 0.20),
+    ("speaking", 0.15),
+    ("listening", 0.15),
+)
+
+
+@dataclass(slots=True, frozen=True)
+class SkillBreakdown:
+    """Per-skill accuracy in a performance analysis"""
+    skill: str
+    accuracy: float
+    correct: int
+    total: int
+
+
+@dataclass(slots=True, frozen=True)
+class VocabRecommendation:
+    """A word to review, with its first recorded translation and context"""
+    word: str
+    translation: str
+    mistake_count: int
+    context: str
+
 
 class AIAdaptiveEngine:
     """
@@ -23,13 +56,11 @@ class AIAdaptiveEngine:
     DIFFICULTY_DOWN_THRESHOLD = 0.60  # Below 60% -> decrease difficulty
     
     # Skill weights for overall level calculation
-    SKILL_WEIGHTS = {
-        "grammar": 0.25,
-        "vocabulary": 0.25,
-        "pronunciation": 0.20,
-        "speaking": 0.15,
-        "listening": 0.15
-    }
+    SKILL_WEIGHTS = dict(_SKILL_WEIGHT_PAIRS)
+    
+    # Minimum weighted score for each level above A1, in ascending order
+    CEFR_THRESHOLDS = (40, 55, 70, 80, 90)
+    CEFR_LEVELS = ("A1", "A2", "B1", "B2", "C1", "C2")
     
     @staticmethod
     def calculate_cefr_level(placement_results: Dict[str, float]) -> str:
@@ -46,9 +77,10 @@ class AIAdaptiveEngine:
         total_weight = 0
         weighted_sum = 0
         
-        for skill, weight in AIAdaptiveEngine.SKILL_WEIGHTS.items():
-            if skill in placement_results:
-                weighted_sum += placement_results[skill] * weight
+        for skill, weight in _SKILL_WEIGHT_PAIRS:
+            score = placement_results.get(skill)
+            if score is not None:
+                weighted_sum += score * weight
                 total_weight += weight
         
         if total_weight == 0:
@@ -56,19 +88,10 @@ class AIAdaptiveEngine:
         
         avg_score = weighted_sum / total_weight
         
-        # Map score to CEFR level
-        if avg_score >= 90:
-            return "C2"
-        elif avg_score >= 80:
-            return "C1"
-        elif avg_score >= 70:
-            return "B2"
-        elif avg_score >= 55:
-            return "B1"
-        elif avg_score >= 40:
-            return "A2"
-        else:
-            return "A1"
+        # Map score to CEFR level: number of thresholds reached
+        return AIAdaptiveEngine.CEFR_LEVELS[
+            bisect.bisect_right(AIAdaptiveEngine.CEFR_THRESHOLDS, avg_score)
+        ]
     
     @staticmethod
     def analyze_performance(answers: List[Dict]) -> Dict[str, Any]:
@@ -81,21 +104,15 @@ class AIAdaptiveEngine:
         Returns:
             Analysis with skill breakdown and recommendations
         """
-        skill_stats = {}
-        total_correct = 0
         total_questions = len(answers)
         
-        for answer in answers:
-            skill = answer.get("skill_tag", "general")
-            is_correct = answer.get("is_correct", False)
-            
-            if skill not in skill_stats:
-                skill_stats[skill] = {"correct": 0, "total": 0}
-            
-            skill_stats[skill]["total"] += 1
-            if is_correct:
-                skill_stats[skill]["correct"] += 1
-                total_correct += 1
+        # Counter does the per-skill counting in C (skills keep first-seen order)
+        skills = [answer.get("skill_tag", "general") for answer in answers]
+        totals = Counter(skills)
+        corrects = Counter(
+            skill for skill, answer in zip(skills, answers) if answer.get("is_correct", False)
+        )
+        total_correct = sum(corrects.values())
         
         # Calculate percentages
         overall_accuracy = (total_correct / total_questions * 100) if total_questions > 0 else 0
@@ -104,14 +121,10 @@ class AIAdaptiveEngine:
         weak_skills = []
         strong_skills = []
         
-        for skill, stats in skill_stats.items():
-            accuracy = (stats["correct"] / stats["total"] * 100) if stats["total"] > 0 else 0
-            skill_breakdown.append({
-                "skill": skill,
-                "accuracy": round(accuracy, 1),
-                "correct": stats["correct"],
-                "total": stats["total"]
-            })
+        for skill, total in totals.items():
+            correct = corrects[skill]
+            accuracy = correct / total * 100
+            skill_breakdown.append(SkillBreakdown(skill, round(accuracy, 1), correct, total))
             
             if accuracy < 60:
                 weak_skills.append(skill)
@@ -140,12 +153,11 @@ class AIAdaptiveEngine:
             return 0
         
         # Consider last 5 scores
-        recent = recent_scores[-5:]
-        avg_score = sum(recent) / len(recent)
+        avg_score = statistics.fmean(recent_scores[-5:])
         
-        if avg_score >= AIAdaptiveEngine.DIFFICULTY_UP_THRESHOLD * 100:
+        if avg_score >= _DIFFICULTY_UP:
             return 1
-        elif avg_score < AIAdaptiveEngine.DIFFICULTY_DOWN_THRESHOLD * 100:
+        elif avg_score < _DIFFICULTY_DOWN:
             return -1
         return 0
     
@@ -163,21 +175,24 @@ class AIAdaptiveEngine:
         Returns:
             Recommendation for next content
         """
-        # Find weakest skill
+        # Find weakest skill and collect priority skills in one pass
         weakest_skill = None
         lowest_accuracy = 100
+        priority_skills = []
         
         for skill, stats in skill_stats.items():
-            if stats.get("accuracy", 100) < lowest_accuracy:
-                lowest_accuracy = stats["accuracy"]
+            accuracy = stats.get("accuracy", 100)
+            if accuracy < lowest_accuracy:
+                lowest_accuracy = accuracy
                 weakest_skill = skill
+            if accuracy < 70:
+                priority_skills.append(skill)
         
         return {
             "recommended_level": user_level,
             "focus_skill": weakest_skill or "vocabulary",
             "suggested_lesson_type": "review" if lowest_accuracy < 60 else "daily",
-            "priority_skills": [s for s, stats in skill_stats.items() 
-                              if stats.get("accuracy", 100) < 70]
+            "priority_skills": priority_skills
         }
     
     @staticmethod
@@ -193,42 +208,41 @@ class AIAdaptiveEngine:
             List of question IDs for review
         """
         # Sort by mistake frequency and recency
-        mistake_scores = {}
         now = datetime.now()
+        counts = Counter()
+        # Newest mistake time per question - its best recency
+        newest = {}
+        # Mistakes from one session share a timestamp, so parse each string once
+        parsed = {}
         
         for mistake in mistakes:
             q_id = mistake.get("question_id")
             mistake_time = mistake.get("timestamp", now)
             
             if isinstance(mistake_time, str):
-                mistake_time = datetime.fromisoformat(mistake_time)
-            
-            # Recent mistakes get higher priority
-            days_ago = (now - mistake_time).days
-            recency_score = max(0, 30 - days_ago) / 30  # 0-1 based on recency
+                ts = mistake_time
+                mistake_time = parsed.get(ts)
+                if mistake_time is None:
+                    mistake_time = parsed[ts] = datetime.fromisoformat(ts)
             
-            if q_id not in mistake_scores:
-                mistake_scores[q_id] = {"count": 0, "recency": 0}
-            
-            mistake_scores[q_id]["count"] += 1
-            mistake_scores[q_id]["recency"] = max(
-                mistake_scores[q_id]["recency"], 
-                recency_score
-            )
+            counts[q_id] += 1
+            if q_id not in newest or mistake_time > newest[q_id]:
+                newest[q_id] = mistake_time
         
-        # Calculate final score
-        scored_questions = []
-        for q_id, scores in mistake_scores.items():
-            final_score = scores["count"] * 0.6 + scores["recency"] * 0.4
-            scored_questions.append((q_id, final_score))
+        # Recent mistakes get higher priority; recency is 0-1 over the last 30 days,
+        # computed once per question from its newest mistake
+        scored_questions = (
+            (q_id, count * 0.6 + max(0, 30 - (now - newest[q_id]).days) / 30 * 0.4)
+            for q_id, count in counts.items()
+        )
         
-        # Sort by score and return top N
-        scored_questions.sort(key=lambda x: x[1], reverse=True)
-        return [q[0] for q in scored_questions[:count]]
+        # Top N by score (same order as a stable descending sort)
+        top = heapq.nlargest(count, scored_questions, key=itemgetter(1))
+        return [q_id for q_id, _ in top]
     
     @staticmethod
     def generate_vocabulary_recommendations(mistakes: List[Dict], 
-                                           known_words: List[str]) -> List[Dict]:
+                                           known_words: List[str]) -> List[VocabRecommendation]:
         """
         Generate personalized vocabulary list based on mistakes
         
@@ -239,22 +253,30 @@ class AIAdaptiveEngine:
         Returns:
             List of recommended vocabulary items
         """
-        word_stats = {}
+        known = frozenset(w.lower() for w in known_words)
+        counts = Counter()
+        first_seen = {}  # word -> first mistake mentioning it (translation/context)
         
         for mistake in mistakes:
             word = mistake.get("word", "").lower()
-            if word and word not in known_words:
-                if word not in word_stats:
-                    word_stats[word] = {
-                        "word": word,
-                        "translation": mistake.get("translation", ""),
-                        "mistake_count": 0,
-                        "context": mistake.get("context", "")
-                    }
-                word_stats[word]["mistake_count"] += 1
+            if word and word not in known:
+                counts[word] += 1
+                if word not in first_seen:
+                    first_seen[word] = mistake
         
-        # Sort by mistake count
-        recommendations = list(word_stats.values())
-        recommendations.sort(key=lambda x: x["mistake_count"], reverse=True)
-        
-        return recommendations[:20]  # Return top 20 words to review
+        # Top 20 words to review by mistake count (ties keep first-seen order)
+        top = heapq.nlargest(20, counts.items(), key=itemgetter(1))
+        return [
+            VocabRecommendation(
+                word,
+                first_seen[word].get("translation", ""),
+                count,
+                first_seen[word].get("context", "")
+            )
+            for word, count in top
+        ]
+
+
+# Difficulty thresholds as percentages, matching the 0-100 score scale
+_DIFFICULTY_UP = AIAdaptiveEngine.DIFFICULTY_UP_THRESHOLD * 100
+_DIFFICULTY_DOWN = AIAdaptiveEngine.DIFFICULTY_DOWN_THRESHOLD * 100
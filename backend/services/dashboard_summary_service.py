@@ -0,0 +1,118 @@
+"""
+Dashboard Summary Service
+Maintains the per-user user_dashboard_summary row so the dashboard does not
+have to aggregate user_progress on every load
+"""
+import logging
+
+logger = logging.getLogger(__name__)
+
+class DashboardSummaryService:
+    @staticmethod
+    def record_progress(cursor, user_id, xp_earned, score):
+        """
+        Apply a completed lesson/review/test to the user's summary row.
+        Call after the matching user_progress row has been inserted, and
+        invalidate_user() once the transaction has committed.
+
+        Args:
+            cursor: Database cursor
+            user_id: User ID
+            xp_earned: XP earned by the submission
+            score: Percentage score stored on the user_progress row
+        """
+        # today_date must be assigned last - MySQL applies the SET list left to right
+        cursor.execute(
+            """INSERT INTO user_dashboard_summary
+               (user_id, total_lessons, today_date, today_xp, today_lessons, score_sum)
+               VALUES (%s, 1, CURDATE(), %s, 1, %s)
+               ON DUPLICATE KEY UPDATE
+                   total_lessons = total_lessons + 1,
+                   score_sum = score_sum + VALUES(score_sum),
+                   today_xp = IF(today_date = CURDATE(), today_xp + VALUES(today_xp), VALUES(today_xp)),
+                   today_lessons = IF(today_date = CURDATE(), today_lessons + 1, 1),
+                   today_date = CURDATE()""",
+            (user_id, xp_earned, score)
+        )
+        if cursor.rowcount == 1:
+            # Row was just created - seed it from history (includes this submission)
+            DashboardSummaryService._backfill(cursor, user_id)
+
+    @staticmethod
+    def get_summary(cursor, user_id, row=None):
+        """
+        Get the user's summary with today's counters rolled over if stale.
+        Read-only: a missing or unseeded row (migration 003 not yet run) is
+        computed from user_progress without being stored.
+
+        Args:
+            cursor: Database cursor
+            user_id: User ID
+            row: Optional pre-fetched summary columns (e.g. LEFT JOINed onto
+                 the users query), with today_date = CURDATE() selected AS
+                 is_today; total_lessons is NULL when no row exists
+
+        Returns:
+            Dict with total_lessons, today_xp, today_lessons and avg_score
+        """
+        summary = row
+        if summary is None:
+            cursor.execute(
+                """SELECT total_lessons, today_date = CURDATE() AS is_today,
+                          today_xp, today_lessons, score_sum
+                   FROM user_dashboard_summary WHERE user_id = %s""",
+                (user_id,)
+            )
+            summary = cursor.fetchone()
+        # score_sum is NULL on rows created before it was tracked
+        if not summary or summary["total_lessons"] is None or summary["score_sum"] is None:
+            summary = DashboardSummaryService._compute(cursor, user_id)
+        return DashboardSummaryService._format(summary)
+
+    @staticmethod
+    def _format(summary):
+        """Zero today's counters if the row was last written on an earlier day"""
+        # Compared in SQL: the row is stamped with the database's CURDATE(),
+        # which can differ from the app server's date
+        is_today = bool(summary["is_today"])
+        total_lessons = summary["total_lessons"] or 0
+        return {
+            "total_lessons": total_lessons,
+            "avg_score": (summary["score_sum"] or 0) / total_lessons if total_lessons else 0.0,
+            "today_xp": int(summary["today_xp"] or 0) if is_today else 0,
+            "today_lessons": int(summary["today_lessons"] or 0) if is_today else 0
+        }
+
+    @staticmethod
+    def _compute(cursor, user_id):
+        """Aggregate the summary columns from user_progress"""
+        cursor.execute(
+            """SELECT COUNT(*) as total_lessons,
+                      CURDATE() as today_date,
+                      1 as is_today,
+                      COALESCE(SUM(CASE WHEN completed_at >= CURDATE() THEN xp_earned ELSE 0 END), 0) as today_xp,
+                      COALESCE(SUM(CASE WHEN completed_at >= CURDATE() THEN 1 ELSE 0 END), 0) as today_lessons,
+                      COALESCE(SUM(score), 0) as score_sum
+               FROM user_progress WHERE user_id = %s""",
+            (user_id,)
+        )
+        return cursor.fetchone()
+
+    @staticmethod
+    def _backfill(cursor, user_id):
+        """Rebuild the summary row from user_progress"""
+        summary = DashboardSummaryService._compute(cursor, user_id)
+        cursor.execute(
+            """INSERT INTO user_dashboard_summary
+               (user_id, total_lessons, today_date, today_xp, today_lessons, score_sum)
+               VALUES (%s, %s, %s, %s, %s, %s)
+               ON DUPLICATE KEY UPDATE
+                   total_lessons = VALUES(total_lessons),
+                   today_date = VALUES(today_date),
+                   today_xp = VALUES(today_xp),
+                   today_lessons = VALUES(today_lessons),
+                   score_sum = VALUES(score_sum)""",
+            (user_id, summary["total_lessons"], summary["today_date"],
+             summary["today_xp"], summary["today_lessons"], summary["score_sum"])
+        )
+        return summary
@@ -2,20 +2,75 @@
 Google Gemini Service - AI Integration
 """
 import google.generativeai as genai
+import google.ai.generativelanguage as glm
+from google.api_core import exceptions as google_exceptions
 from typing import Optional, Dict, Any, List
-import json
+import asyncio
+import orjson
 import logging
+import random
+import re
+
+from utils.cache import grammar_explanation_cache
 
 logger = logging.getLogger(__name__)
 
+# Matches a JSON object wrapped in a markdown code fence (```json ... ``` or ``` ... ```)
+_FENCE_RE = re.compile(r"```(?:json)?\s*(\{.*?\})\s*```", re.DOTALL)
+
+# Transcript line prefixes, indexed by bool(msg["is_ai"])
+_ROLES = ("Student: ", "AI: ")
+
+# Rate limits and timeouts are retried with exponential backoff (1s, 2s, ... plus jitter)
+_RETRYABLE_ERRORS = (
+    google_exceptions.ResourceExhausted,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.DeadlineExceeded,
+)
+_MAX_ATTEMPTS = 3
+_MAX_BACKOFF = 30
+
+
+def make_async_client(api_key: str) -> glm.GenerativeServiceAsyncClient:
+    """
+    A Gemini client bound to one API key. GenerativeModel otherwise falls back to
+    the client built from the process-wide genai.configure() key, which would let
+    one user's request run on whichever user's key was configured last.
+    Create it on the event loop: the gRPC asyncio channel binds to the running loop.
+    """
+    return glm.GenerativeServiceAsyncClient(client_options={"api_key": api_key})
+
+
+def _extract_json(text: str) -> str:
+    """Return the fenced JSON object in text, or the whole text if it is not fenced"""
+    m = _FENCE_RE.search(text)
+    return (m.group(1) if m else text).strip()
+
 
 class GeminiService:
     """Service for Google Gemini API interactions"""
     
     def __init__(self, api_key: str):
-        genai.configure(api_key=api_key)
+        self._api_key = api_key
         self.model = genai.GenerativeModel('gemini-pro')
-        self.vision_model = genai.GenerativeModel('gemini-pro-vision')
+    
+    async def _generate(self, prompt: str, temperature: float, max_output_tokens: int):
+        """Call generate_content, retrying rate limits and timeouts with backoff"""
+        if self.model._async_client is None:
+            self.model._async_client = make_async_client(self._api_key)
+        config = genai.GenerationConfig(
+            temperature=temperature,
+            max_output_tokens=max_output_tokens
+        )
+        for attempt in range(_MAX_ATTEMPTS):
+            try:
+                return await self.model.generate_content_async(prompt, generation_config=config)
+            except _RETRYABLE_ERRORS as e:
+                if attempt == _MAX_ATTEMPTS - 1:
+                    raise
+                delay = min(2 ** attempt + random.random(), _MAX_BACKOFF)
+                logger.warning(f"Gemini call failed ({e}), retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
     
     async def analyze_speech(self, transcript: str, context: str,
                            user_level: str) -> Dict[str, Any]:
@@ -51,23 +106,11 @@ Analyze the response and provide scores and feedback. Return ONLY valid JSON in
 Be encouraging but accurate. Adjust expectations based on their CEFR level."""
 
         try:
-            response = self.model.generate_content(
-                prompt,
-                generation_config=genai.GenerationConfig(
-                    temperature=0.3,
-                    max_output_tokens=1000
-                )
-            )
-            
-            # Parse JSON from response
-            response_text = response.text
-            # Extract JSON if wrapped in markdown
-            if "```json" in response_text:
-                response_text = response_text.split("```json")[1].split("```")[0]
-            elif "```" in response_text:
-                response_text = response_text.split("```")[1].split("```")[0]
+            response = await self._generate(prompt, temperature=0.3, max_output_tokens=1000)
             
-            result = json.loads(response_text.strip())
+            # Parse JSON from response (unwrapping a markdown fence if present)
+            response_text = _extract_json(response.text)
+            result = orjson.loads(response_text)
             result["success"] = True
             return result
             
@@ -87,10 +130,10 @@ Be encouraging but accurate. Adjust expectations based on their CEFR level."""
         """
         Generate AI response for roleplay conversation using Gemini
         """
-        history_text = "\n".join([
-            f"{'AI' if msg.get('is_ai') else 'Student'}: {msg.get('text', '')}"
+        history_text = "\n".join(
+            _ROLES[bool(msg.get("is_ai"))] + msg.get("text", "")
             for msg in conversation_history[-6:]
-        ])
+        )
         
         prompt = f"""You are playing a role in a language learning scenario.
 Adapt your language complexity to {user_level} level (CEFR scale).
@@ -115,21 +158,10 @@ Return ONLY valid JSON in this exact format:
 }}"""
 
         try:
-            response = self.model.generate_content(
-                prompt,
-                generation_config=genai.GenerationConfig(
-                    temperature=0.7,
-                    max_output_tokens=300
-                )
-            )
+            response = await self._generate(prompt, temperature=0.7, max_output_tokens=300)
             
-            response_text = response.text
-            if "```json" in response_text:
-                response_text = response_text.split("```json")[1].split("```")[0]
-            elif "```" in response_text:
-                response_text = response_text.split("```")[1].split("```")[0]
-            
-            result = json.loads(response_text.strip())
+            response_text = _extract_json(response.text)
+            result = orjson.loads(response_text)
             result["success"] = True
             return result
             
@@ -147,10 +179,10 @@ Return ONLY valid JSON in this exact format:
         """
         Generate response for free talk session using Gemini
         """
-        history_text = "\n".join([
-            f"{'AI' if msg.get('is_ai') else 'Student'}: {msg.get('text', '')}"
+        history_text = "\n".join(
+            _ROLES[bool(msg.get("is_ai"))] + msg.get("text", "")
             for msg in conversation_history[-8:]
-        ])
+        )
         
         prompt = f"""You are a friendly English conversation partner.
 The student is at {user_level} level (CEFR scale).
@@ -174,21 +206,10 @@ Return ONLY valid JSON in this exact format:
 }}"""
 
         try:
-            response = self.model.generate_content(
-                prompt,
-                generation_config=genai.GenerationConfig(
-                    temperature=0.8,
-                    max_output_tokens=200
-                )
-            )
-            
-            response_text = response.text
-            if "```json" in response_text:
-                response_text = response_text.split("```json")[1].split("```")[0]
-            elif "```" in response_text:
-                response_text = response_text.split("```")[1].split("```")[0]
+            response = await self._generate(prompt, temperature=0.8, max_output_tokens=200)
             
-            result = json.loads(response_text.strip())
+            response_text = _extract_json(response.text)
+            result = orjson.loads(response_text)
             result["success"] = True
             return result
             
@@ -204,7 +225,13 @@ Return ONLY valid JSON in this exact format:
                                           user_level: str) -> Dict[str, Any]:
         """
         Generate grammar explanation appropriate for user level
+        Successful explanations are cached per (grammar point, level)
         """
+        cache_key = (grammar_point.strip().lower(), user_level)
+        cached = grammar_explanation_cache.get(cache_key)
+        if cached is not None:
+            return dict(cached)
+
         prompt = f"""Explain the following English grammar point to a student at {user_level} level (CEFR scale).
 
 Grammar point: {grammar_point}
@@ -223,23 +250,13 @@ Return ONLY valid JSON in this exact format:
 }}"""
 
         try:
-            response = self.model.generate_content(
-                prompt,
-                generation_config=genai.GenerationConfig(
-                    temperature=0.3,
-                    max_output_tokens=500
-                )
-            )
-            
-            response_text = response.text
-            if "```json" in response_text:
-                response_text = response_text.split("```json")[1].split("```")[0]
-            elif "```" in response_text:
-                response_text = response_text.split("```")[1].split("```")[0]
+            response = await self._generate(prompt, temperature=0.3, max_output_tokens=500)
             
-            result = json.loads(response_text.strip())
+            response_text = _extract_json(response.text)
+            result = orjson.loads(response_text)
             result["success"] = True
-            return result
+            grammar_explanation_cache[cache_key] = result
+            return dict(result)
             
         except Exception as e:
             logger.error(f"Gemini grammar explanation error: {e}")
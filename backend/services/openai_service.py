@@ -2,36 +2,123 @@
 OpenAI Service - GPT-4 and Whisper Integration
 """
 import openai
-from typing import Optional, Dict, Any, List
-import json
+import httpx
+import io
+from functools import lru_cache
+from typing import Optional, Dict, Any, List, Union, BinaryIO, AsyncIterator
+import orjson
 import logging
 import base64
 
 logger = logging.getLogger(__name__)
 
+# One connection pool shared by every OpenAI client, so keep-alive
+# connections to the API are reused across users and requests
+# (the API key is sent per request, not bound to the connection).
+# Async, so in-flight API calls don't block the event loop
+_http_client = httpx.AsyncClient(
+    limits=httpx.Limits(max_connections=100, max_keepalive_connections=50)
+)
+
+# Chat roles, indexed by bool(msg["is_ai"])
+_CHAT_ROLES = ("user", "assistant")
+
+# The SDK retries 429s, timeouts and 5xx itself with exponential backoff
+# (honouring Retry-After); allow one more attempt than its default of 2 retries
+_MAX_RETRIES = 3
+
+
+# System prompts depend only on the CEFR level (and the roleplay scenario),
+# so each distinct prompt is formatted once and reused
+@lru_cache(maxsize=32)
+def _analysis_system_prompt(user_level: str) -> str:
+    return f"""You are an expert English language tutor analyzing a student's spoken response.
+The student is at {user_level} level (CEFR scale).
+
+Analyze the following speech and provide scores and feedback in JSON format:
+{{
+    "fluency_score": 0-100,
+    "grammar_score": 0-100,
+    "vocabulary_score": 0-100,
+    "pronunciation_notes": "notes on pronunciation patterns if detectable",
+    "grammar_errors": ["list of grammar mistakes"],
+    "vocabulary_suggestions": ["better word choices"],
+    "overall_feedback": "constructive feedback message",
+    "corrected_text": "the text with corrections applied"
+}}
+
+Be encouraging but accurate. Adjust expectations based on their CEFR level."""
+
+
+@lru_cache(maxsize=256)
+def _roleplay_system_prompt(scenario: str, user_level: str) -> str:
+    return f"""You are playing a role in a language learning scenario.
+Adapt your language complexity to {user_level} level (CEFR scale).
+
+Scenario: {scenario}
+
+Guidelines:
+- Stay in character
+- Use natural conversational English
+- Adjust vocabulary complexity for {user_level} level
+- If the student makes errors, subtly model correct usage
+- Keep responses concise (2-3 sentences max)
+- End with something that prompts a response from the student
+
+Respond in JSON format:
+{{
+    "response": "your in-character response",
+    "hint": "optional hint for the student on how to respond",
+    "vocabulary_highlight": ["new/useful words used"]
+}}"""
+
+
+@lru_cache(maxsize=32)
+def _free_talk_system_prompt(user_level: str) -> str:
+    return f"""You are a friendly English conversation partner.
+The student is at {user_level} level (CEFR scale).
+
+Guidelines:
+- Be natural and conversational
+- Show interest in what the student says
+- Ask follow-up questions to keep conversation flowing
+- Gently correct major errors by modeling correct usage
+- Use vocabulary appropriate for their level
+
+Respond in JSON format:
+{{
+    "response": "your conversational response",
+    "follow_up_question": "a question to continue the conversation",
+    "correction": "subtle correction if needed, null otherwise"
+}}"""
+
 
 class OpenAIService:
     """Service for OpenAI API interactions"""
     
     def __init__(self, api_key: str):
-        self.client = openai.OpenAI(api_key=api_key)
+        self.client = openai.AsyncOpenAI(
+            api_key=api_key, http_client=_http_client, max_retries=_MAX_RETRIES
+        )
         self.model = "gpt-4o"  # Use GPT-4o for better performance
         self.whisper_model = "whisper-1"
     
-    async def transcribe_audio(self, audio_data: bytes, language: str = "en") -> Dict[str, Any]:
+    async def transcribe_audio(self, audio_data: Union[bytes, BinaryIO], language: str = "en") -> Dict[str, Any]:
         """
         Transcribe audio using Whisper
         
         Args:
-            audio_data: Audio file bytes
+            audio_data: Audio file bytes or a binary file object (streamed to the API)
             language: Target language code
         
         Returns:
             Dict with transcription and metadata
         """
+        if isinstance(audio_data, (bytes, bytearray)):
+            # Hand the SDK a file object so it streams the upload instead of copying the bytes
+            audio_data = io.BytesIO(audio_data)
         try:
-            # Write audio to temp file-like object
-            transcript = self.client.audio.transcriptions.create(
+            transcript = await self.client.audio.transcriptions.create(
                 model=self.whisper_model,
                 file=("audio.webm", audio_data, "audio/webm"),
                 language=language,
@@ -65,22 +152,7 @@ class OpenAIService:
         Returns:
             Analysis scores and feedback
         """
-        system_prompt = f"""You are an expert English language tutor analyzing a student's spoken response.
-The student is at {user_level} level (CEFR scale).
-
-Analyze the following speech and provide scores and feedback in JSON format:
-{{
-    "fluency_score": 0-100,
-    "grammar_score": 0-100,
-    "vocabulary_score": 0-100,
-    "pronunciation_notes": "notes on pronunciation patterns if detectable",
-    "grammar_errors": ["list of grammar mistakes"],
-    "vocabulary_suggestions": ["better word choices"],
-    "overall_feedback": "constructive feedback message",
-    "corrected_text": "the text with corrections applied"
-}}
-
-Be encouraging but accurate. Adjust expectations based on their CEFR level."""
+        system_prompt = _analysis_system_prompt(user_level)
 
         user_prompt = f"""Context/Prompt: {context}
 
@@ -89,7 +161,7 @@ Student's Response: {transcript}
 Provide your analysis in JSON format."""
 
         try:
-            response = self.client.chat.completions.create(
+            response = await self.client.chat.completions.create(
                 model=self.model,
                 messages=[
                     {"role": "system", "content": system_prompt},
@@ -99,7 +171,7 @@ Provide your analysis in JSON format."""
                 temperature=0.3
             )
             
-            result = json.loads(response.choices[0].message.content)
+            result = orjson.loads(response.choices[0].message.content)
             result["success"] = True
             return result
             
@@ -127,34 +199,16 @@ Provide your analysis in JSON format."""
         Returns:
             AI response with coaching hints
         """
-        system_prompt = f"""You are playing a role in a language learning scenario.
-Adapt your language complexity to {user_level} level (CEFR scale).
-
-Scenario: {scenario}
-
-Guidelines:
-- Stay in character
-- Use natural conversational English
-- Adjust vocabulary complexity for {user_level} level
-- If the student makes errors, subtly model correct usage
-- Keep responses concise (2-3 sentences max)
-- End with something that prompts a response from the student
-
-Respond in JSON format:
-{{
-    "response": "your in-character response",
-    "hint": "optional hint for the student on how to respond",
-    "vocabulary_highlight": ["new/useful words used"]
-}}"""
+        system_prompt = _roleplay_system_prompt(scenario, user_level)
 
         messages = [{"role": "system", "content": system_prompt}]
-        
-        for msg in conversation_history:
-            role = "assistant" if msg.get("is_ai") else "user"
-            messages.append({"role": role, "content": msg.get("text", "")})
+        messages += [
+            {"role": _CHAT_ROLES[bool(msg.get("is_ai"))], "content": msg.get("text", "")}
+            for msg in conversation_history
+        ]
         
         try:
-            response = self.client.chat.completions.create(
+            response = await self.client.chat.completions.create(
                 model=self.model,
                 messages=messages,
                 response_format={"type": "json_object"},
@@ -162,7 +216,7 @@ Respond in JSON format:
                 max_tokens=300
             )
             
-            result = json.loads(response.choices[0].message.content)
+            result = orjson.loads(response.choices[0].message.content)
             result["success"] = True
             return result
             
@@ -180,33 +234,18 @@ Respond in JSON format:
         """
         Generate response for free talk session
         """
-        system_prompt = f"""You are a friendly English conversation partner.
-The student is at {user_level} level (CEFR scale).
-
-Guidelines:
-- Be natural and conversational
-- Show interest in what the student says
-- Ask follow-up questions to keep conversation flowing
-- Gently correct major errors by modeling correct usage
-- Use vocabulary appropriate for their level
-
-Respond in JSON format:
-{{
-    "response": "your conversational response",
-    "follow_up_question": "a question to continue the conversation",
-    "correction": "subtle correction if needed, null otherwise"
-}}"""
+        system_prompt = _free_talk_system_prompt(user_level)
 
         messages = [{"role": "system", "content": system_prompt}]
-        
-        for msg in conversation_history[-10:]:  # Last 10 messages
-            role = "assistant" if msg.get("is_ai") else "user"
-            messages.append({"role": role, "content": msg.get("text", "")})
+        messages += [
+            {"role": _CHAT_ROLES[bool(msg.get("is_ai"))], "content": msg.get("text", "")}
+            for msg in conversation_history[-10:]  # Last 10 messages
+        ]
         
         messages.append({"role": "user", "content": user_message})
         
         try:
-            response = self.client.chat.completions.create(
+            response = await self.client.chat.completions.create(
                 model=self.model,
                 messages=messages,
                 response_format={"type": "json_object"},
@@ -214,7 +253,7 @@ Respond in JSON format:
                 max_tokens=200
             )
             
-            result = json.loads(response.choices[0].message.content)
+            result = orjson.loads(response.choices[0].message.content)
             result["success"] = True
             return result
             
@@ -238,7 +277,7 @@ Respond in JSON format:
             Audio bytes or None
         """
         try:
-            response = self.client.audio.speech.create(
+            response = await self.client.audio.speech.create(
                 model="tts-1",
                 voice=voice,
                 input=text
@@ -247,3 +286,26 @@ Respond in JSON format:
         except Exception as e:
             logger.error(f"TTS generation error: {e}")
             return None
+    
+    async def stream_text_to_speech(self, text: str, voice: str = "alloy",
+                                    chunk_size: int = 4096) -> AsyncIterator[bytes]:
+        """
+        Generate speech audio from text, yielding chunks as they arrive
+        so the full audio is never held in memory
+        
+        Args:
+            text: Text to convert to speech
+            voice: Voice to use (alloy, echo, fable, onyx, nova, shimmer)
+            chunk_size: Bytes per yielded chunk
+        """
+        try:
+            async with self.client.audio.speech.with_streaming_response.create(
+                model="tts-1",
+                voice=voice,
+                input=text
+            ) as response:
+                async for chunk in response.iter_bytes(chunk_size):
+                    yield chunk
+        except Exception as e:
+            logger.error(f"TTS streaming error: {e}")
+            raise
@@ -0,0 +1,120 @@
+"""
+Skill Stats Service
+Maintains per-user skill accuracy counters in user_skill_stats
+"""
+from collections import Counter
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Zero-count row written by every backfill, so a user whose history has no
+# tagged answers is still marked as seeded and isn't rescanned on each read.
+# _tally drops empty skill tags, so it never collides with a real skill.
+_SEEDED_SKILL = ""
+
+class SkillStatsService:
+    @staticmethod
+    def record_answers(cursor, user_id, results):
+        """
+        Add graded answers to the user's skill counters.
+        Call after the matching user_progress row has been inserted.
+
+        Args:
+            cursor: Database cursor
+            user_id: User ID
+            results: List of dicts containing skill_tag and is_correct
+        """
+        cursor.execute(
+            "SELECT COUNT(*) as count FROM user_skill_stats WHERE user_id = %s",
+            (user_id,)
+        )
+        if cursor.fetchone()["count"] == 0:
+            # First write for this user - seed from history (includes this submission)
+            SkillStatsService._backfill(cursor, user_id)
+            return
+
+        stats = SkillStatsService._tally(results)
+        if stats:
+            cursor.executemany(
+                """INSERT INTO user_skill_stats (user_id, skill, total, correct)
+                   VALUES (%s, %s, %s, %s)
+                   ON DUPLICATE KEY UPDATE total = total + VALUES(total),
+                                           correct = correct + VALUES(correct)""",
+                [(user_id, skill, s["total"], s["correct"]) for skill, s in stats.items()]
+            )
+
+    @staticmethod
+    def get_skill_stats(cursor, user_id):
+        """
+        Get the user's skill counters.
+
+        Returns:
+            Dict mapping skill -> {"total": int, "correct": int}
+        """
+        cursor.execute(
+            "SELECT skill, total, correct FROM user_skill_stats WHERE user_id = %s",
+            (user_id,)
+        )
+        rows = cursor.fetchall()
+        if rows:
+            return {
+                r["skill"]: {"total": r["total"], "correct": r["correct"]}
+                for r in rows if r["skill"] != _SEEDED_SKILL
+            }
+        return SkillStatsService._backfill(cursor, user_id)
+
+    @staticmethod
+    def _backfill(cursor, user_id):
+        """Build counters from the user's stored answers (for history recorded before the table existed)"""
+        cursor.execute(
+            "SELECT answers FROM user_progress WHERE user_id = %s",
+            (user_id,)
+        )
+        # Stream rows off the (unbuffered) cursor and tally as we go so a long
+        # history is never held in memory as one list of JSON blobs
+        totals = Counter()
+        corrects = Counter()
+        for row in cursor:
+            if not row["answers"]:
+                continue
+            try:
+                answers = json.loads(row["answers"]) if isinstance(row["answers"], str) else row["answers"]
+            except (json.JSONDecodeError, TypeError):
+                continue
+            if not isinstance(answers, list):
+                continue
+            for answer in answers:
+                if isinstance(answer, dict):
+                    skill = answer.get("skill_tag")
+                    if skill:
+                        totals[skill] += 1
+                        if answer.get("is_correct", False):
+                            corrects[skill] += 1
+
+        stats = {
+            skill: {"total": total, "correct": corrects[skill]}
+            for skill, total in totals.items()
+        }
+        logger.info(f"Backfilling skill stats for user {user_id}")
+        cursor.executemany(
+            """INSERT INTO user_skill_stats (user_id, skill, total, correct)
+               VALUES (%s, %s, %s, %s)
+               ON DUPLICATE KEY UPDATE total = VALUES(total), correct = VALUES(correct)""",
+            [(user_id, _SEEDED_SKILL, 0, 0)]
+            + [(user_id, skill, s["total"], s["correct"]) for skill, s in stats.items()]
+        )
+        return stats
+
+    @staticmethod
+    def _tally(results):
+        """Count total and correct answers per skill"""
+        # Counter does the per-skill counting in C
+        totals = Counter(res.get("skill_tag") for res in results)
+        corrects = Counter(res.get("skill_tag") for res in results if res.get("is_correct", False))
+        totals.pop(None, None)
+        totals.pop("", None)
+        return {
+            skill: {"total": total, "correct": corrects[skill]}
+            for skill, total in totals.items()
+        }
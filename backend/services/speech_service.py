@@ -1,18 +1,59 @@
 """
 Speech Service - Unified interface for speech processing
 """
-from typing import Optional, Dict, Any, List
+from types import MappingProxyType
+from typing import Optional, Dict, Any, List, Union, BinaryIO, Awaitable, Callable, AsyncIterator, Mapping
+import asyncio
 import logging
+import weakref
+from cachetools import TTLCache
+from utils.encryption import fingerprint_api_key
 from .openai_service import OpenAIService
 from .gemini_service import GeminiService
 
 logger = logging.getLogger(__name__)
 
+# Roleplay openers depend only on scenario and level, so they are reused -
+# per API key (fingerprint), so each user's key pays for the results it gets.
+# Speech analyses are left uncached: they are sampled, not deterministic.
+_opener_cache = TTLCache(maxsize=512, ttl=3600)
+
+# Provider calls allowed in flight per API key, shared by every SpeechService
+# built with that key (including uncached or rebuilt ones); a burst beyond this
+# queues instead of tripping the provider's limits. Keyed by (provider, key
+# fingerprint); an entry goes away with the last service holding it.
+PROVIDER_CONCURRENCY = 8
+_provider_limits: "weakref.WeakValueDictionary[tuple, asyncio.Semaphore]" = weakref.WeakValueDictionary()
+
+# Provider calls currently in flight, so concurrent identical requests made
+# with the same API key share one round-trip instead of each paying for it.
+# Keys include the key fingerprint: requests on different users' keys never
+# share a call (or its result).
+_inflight: Dict[tuple, asyncio.Future] = {}
+
+
+async def _coalesce(key: tuple, call: Callable[[], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+    """Run call() once per key at a time; concurrent callers await the same result"""
+    future = _inflight.get(key)
+    if future is None:
+        future = asyncio.ensure_future(call())
+        _inflight[key] = future
+        future.add_done_callback(lambda _: _inflight.pop(key, None))
+    # Shielded so one client disconnecting doesn't cancel the call for the others
+    return dict(await asyncio.shield(future))
+
+
+def _normalize_utterance(text: str) -> str:
+    """Collapse case and whitespace so trivially different inputs share a key"""
+    return " ".join(text.casefold().split())
+
 
 class SpeechService:
     """
     Unified speech service that routes to OpenAI or Gemini
-    based on user preference and API key availability
+    based on user preference and API key availability.
+    Results are plain dicts of JSON-native values (no datetime/Decimal), so the
+    app's default ORJSONResponse serialises them without a conversion pass.
     """
     
     def __init__(self, openai_key: Optional[str] = None, 
@@ -21,9 +62,20 @@ class SpeechService:
         self.openai_service = OpenAIService(openai_key) if openai_key else None
         self.gemini_service = GeminiService(gemini_key) if gemini_key else None
         self.preferred = preferred_provider
+        self._chosen = self._choose_service()
+        self._key_ids = {
+            "openai": fingerprint_api_key(openai_key) if openai_key else None,
+            "gemini": fingerprint_api_key(gemini_key) if gemini_key else None
+        }
+        self._limits: Dict[str, asyncio.Semaphore] = {}
+        self._configured = MappingProxyType({
+            "openai": self.openai_service is not None,
+            "gemini": self.gemini_service is not None,
+            "any": self.openai_service is not None or self.gemini_service is not None
+        })
     
-    def _get_service(self):
-        """Get the appropriate service based on preference and availability"""
+    def _choose_service(self):
+        """Pick the service based on preference and availability"""
         if self.preferred == "openai" and self.openai_service:
             return self.openai_service, "openai"
         elif self.preferred == "gemini" and self.gemini_service:
@@ -34,14 +86,37 @@ class SpeechService:
             return self.gemini_service, "gemini"
         return None, None
     
-    async def transcribe_audio(self, audio_data: bytes, 
+    def _get_service(self):
+        """Get the appropriate service (chosen once in __init__)"""
+        return self._chosen
+    
+    def _limit(self, provider: str) -> asyncio.Semaphore:
+        """
+        The shared concurrency limit for this service's key with provider.
+        Looked up on first use rather than in __init__, which runs in the
+        threadpool, so the module-level map is only touched from the loop.
+        """
+        limit = self._limits.get(provider)
+        if limit is None:
+            key = (provider, self._key_ids[provider])
+            limit = _provider_limits.get(key)
+            if limit is None:
+                limit = _provider_limits[key] = asyncio.Semaphore(PROVIDER_CONCURRENCY)
+            self._limits[provider] = limit
+        return limit
+    
+    async def transcribe_audio(self, audio_data: Union[bytes, BinaryIO], 
                               language: str = "en") -> Dict[str, Any]:
         """
         Transcribe audio to text
         Note: Only OpenAI supports direct audio transcription
+        
+        Args:
+            audio_data: Audio bytes or a binary file object such as UploadFile.file
         """
         if self.openai_service:
-            return await self.openai_service.transcribe_audio(audio_data, language)
+            async with self._limit("openai"):
+                return await self.openai_service.transcribe_audio(audio_data, language)
         return {
             "success": False,
             "error": "OpenAI API key required for audio transcription",
@@ -58,9 +133,16 @@ class SpeechService:
                 "error": "No AI service configured. Please add an API key in settings."
             }
         
-        result = await service.analyze_speech(transcript, context, user_level)
-        result["provider"] = provider
-        return result
+        key = (provider, self._key_ids[provider], user_level,
+               _normalize_utterance(context), _normalize_utterance(transcript))
+        
+        async def call():
+            async with self._limit(provider):
+                result = await service.analyze_speech(transcript, context, user_level)
+            result["provider"] = provider
+            return result
+        
+        return await _coalesce(("analysis",) + key, call)
     
     async def generate_roleplay_response(self, scenario: str,
                                         conversation_history: List[Dict],
@@ -73,11 +155,29 @@ class SpeechService:
                 "error": "No AI service configured. Please add an API key in settings."
             }
         
-        result = await service.generate_roleplay_response(
-            scenario, conversation_history, user_level
-        )
-        result["provider"] = provider
-        return result
+        # The opening line has no user input, so it can be reused
+        key = (provider, self._key_ids[provider], user_level, scenario) if not conversation_history else None
+        if key is None:
+            async with self._limit(provider):
+                result = await service.generate_roleplay_response(
+                    scenario, conversation_history, user_level
+                )
+            result["provider"] = provider
+            return result
+        
+        cached = _opener_cache.get(key)
+        if cached is not None:
+            return dict(cached)
+        
+        async def call():
+            async with self._limit(provider):
+                result = await service.generate_roleplay_response(scenario, [], user_level)
+            result["provider"] = provider
+            if "error" not in result:
+                _opener_cache[key] = dict(result)
+            return result
+        
+        return await _coalesce(("opener",) + key, call)
     
     async def generate_free_talk_response(self, user_message: str,
                                          conversation_history: List[Dict],
@@ -90,22 +190,39 @@ class SpeechService:
                 "error": "No AI service configured. Please add an API key in settings."
             }
         
-        result = await service.generate_free_talk_response(
-            user_message, conversation_history, user_level
-        )
+        async with self._limit(provider):
+            result = await service.generate_free_talk_response(
+                user_message, conversation_history, user_level
+            )
         result["provider"] = provider
         return result
     
     async def text_to_speech(self, text: str) -> Optional[bytes]:
         """Convert text to speech audio (OpenAI only)"""
-        if self.openai_service:
+        if not self.openai_service:
+            return None
+        
+        async with self._limit("openai"):
             return await self.openai_service.generate_text_to_speech(text)
-        return None
     
-    def is_configured(self) -> Dict[str, bool]:
-        """Check which services are configured"""
-        return {
-            "openai": self.openai_service is not None,
-            "gemini": self.gemini_service is not None,
-            "any": self.openai_service is not None or self.gemini_service is not None
-        }
+    async def stream_text_to_speech(self, text: str) -> AsyncIterator[bytes]:
+        """
+        Stream text to speech audio (OpenAI only), e.g. into a StreamingResponse.
+        The concurrency slot is held only until the provider starts responding,
+        so a slow listener downloading the rest doesn't tie up provider capacity.
+        """
+        if not self.openai_service:
+            return
+        
+        chunks = self.openai_service.stream_text_to_speech(text)
+        async with self._limit("openai"):
+            first = await anext(chunks, None)
+        if first is None:
+            return
+        yield first
+        async for chunk in chunks:
+            yield chunk
+    
+    def is_configured(self) -> Mapping[str, bool]:
+        """Check which services are configured (read-only view, fixed at construction)"""
+        return self._configured
@@ -2,7 +2,26 @@
 XP and Level Calculator Service
 """
 from config import settings
-from typing import Dict, Tuple
+from typing import Dict, NamedTuple, Tuple
+from functools import lru_cache
+import bisect
+
+
+# Completion bonus per lesson type (other types get none)
+_COMPLETION_BONUS = {
+    "daily": settings.XP_DAILY_LESSON_COMPLETE,
+    "grammar_sprint": settings.XP_GRAMMAR_SPRINT_COMPLETE,
+    "word_sprint": settings.XP_WORD_SPRINT_COMPLETE,
+}
+
+
+class LessonXP(NamedTuple):
+    """XP breakdown for a completed lesson"""
+    xp_base: int
+    xp_completion_bonus: int
+    xp_streak_bonus: int
+    xp_perfect_bonus: int
+    xp_total: int
 
 
 class XPCalculator:
@@ -22,28 +41,28 @@ class XPCalculator:
         "C1": 20000,
         "C2": 25000
     }
+    # Same table as parallel ascending tuples, for bisect lookups
+    _LEVELS = tuple(LEVEL_THRESHOLDS)
+    _THRESHOLDS = tuple(LEVEL_THRESHOLDS.values())
     
     @staticmethod
     def calculate_lesson_xp(correct_answers: int, total_questions: int, 
-                           current_streak: int, lesson_type: str) -> Dict:
+                           current_streak: int, lesson_type: str) -> LessonXP:
         """
         Calculate XP earned for a lesson
         
         Returns:
-            Dict with xp_base, xp_streak_bonus, xp_total
+            LessonXP with base, completion, streak and perfect bonuses and the total
         """
         # Base XP from correct answers
         xp_base = correct_answers * settings.XP_PER_CORRECT_ANSWER
         
-        # Completion bonus based on lesson type
-        completion_bonus = 0
-        if correct_answers >= total_questions * 0.6:  # At least 60% correct
-            if lesson_type == "daily":
-                completion_bonus = settings.XP_DAILY_LESSON_COMPLETE
-            elif lesson_type == "grammar_sprint":
-                completion_bonus = settings.XP_GRAMMAR_SPRINT_COMPLETE
-            elif lesson_type == "word_sprint":
-                completion_bonus = settings.XP_WORD_SPRINT_COMPLETE
+        # Completion bonus based on lesson type, for at least 60% correct
+        # (compared in integers: correct / total >= 3 / 5)
+        completion_bonus = (
+            _COMPLETION_BONUS.get(lesson_type, 0)
+            if correct_answers * 5 >= total_questions * 3 else 0
+        )
         
         # Streak bonus (5 XP per day in streak, max 50)
         streak_bonus = min(current_streak * settings.XP_BONUS_STREAK, 50)
@@ -53,23 +72,15 @@ class XPCalculator:
         
         xp_total = xp_base + completion_bonus + streak_bonus + perfect_bonus
         
-        return {
-            "xp_base": xp_base,
-            "xp_completion_bonus": completion_bonus,
-            "xp_streak_bonus": streak_bonus,
-            "xp_perfect_bonus": perfect_bonus,
-            "xp_total": xp_total
-        }
+        return LessonXP(xp_base, completion_bonus, streak_bonus, perfect_bonus, xp_total)
     
     @staticmethod
     def calculate_speaking_xp(fluency_score: float, grammar_score: float, 
                              vocab_score: float, duration_seconds: int) -> int:
         """Calculate XP for speaking sessions"""
-        # Average score (0-100)
-        avg_score = (fluency_score + grammar_score + vocab_score) / 3
-        
-        # Base XP based on performance
-        base_xp = int(avg_score * 0.4)  # Max 40 XP from score
+        # Base XP based on average score (0-100): avg * 0.4, max 40 XP.
+        # Kept as sum * 2 // 15 so integer scores stay in integer arithmetic
+        base_xp = int((fluency_score + grammar_score + vocab_score) * 2 // 15)
         
         # Duration bonus (1 XP per 30 seconds, max 20)
         duration_bonus = min(duration_seconds // 30, 20)
@@ -77,13 +88,17 @@ class XPCalculator:
         return base_xp + duration_bonus + settings.XP_SPEAKING_SESSION
     
     @staticmethod
+    @lru_cache(maxsize=4096)
+    def _level_index_from_xp(total_xp: int) -> int:
+        """Index into _LEVELS for total XP"""
+        # Number of thresholds reached, less one (negative XP still maps to A1)
+        return max(bisect.bisect_right(XPCalculator._THRESHOLDS, total_xp) - 1, 0)
+    
+    @staticmethod
+    @lru_cache(maxsize=4096)
     def get_level_from_xp(total_xp: int) -> str:
         """Determine CEFR level based on total XP"""
-        level = "A1"
-        for cefr, threshold in XPCalculator.LEVEL_THRESHOLDS.items():
-            if total_xp >= threshold:
-                level = cefr
-        return level
+        return XPCalculator._LEVELS[XPCalculator._level_index_from_xp(total_xp)]
     
     @staticmethod
     def check_level_up(old_xp: int, new_xp: int) -> Tuple[bool, str, str]:
@@ -93,18 +108,18 @@ class XPCalculator:
         Returns:
             Tuple of (level_up: bool, old_level: str, new_level: str)
         """
-        old_level = XPCalculator.get_level_from_xp(old_xp)
-        new_level = XPCalculator.get_level_from_xp(new_xp)
+        old_index = XPCalculator._level_index_from_xp(old_xp)
+        new_index = XPCalculator._level_index_from_xp(new_xp)
         
-        level_up = new_level != old_level
-        return level_up, old_level, new_level
+        levels = XPCalculator._LEVELS
+        return new_index != old_index, levels[old_index], levels[new_index]
     
     @staticmethod
     def get_xp_to_next_level(current_xp: int) -> Dict:
         """Get XP progress to next level"""
-        current_level = XPCalculator.get_level_from_xp(current_xp)
-        levels = list(XPCalculator.LEVEL_THRESHOLDS.keys())
-        current_index = levels.index(current_level)
+        levels = XPCalculator._LEVELS
+        current_index = XPCalculator._level_index_from_xp(current_xp)
+        current_level = levels[current_index]
         
         if current_index >= len(levels) - 1:
             # Already at max level
@@ -118,8 +133,8 @@ class XPCalculator:
             }
         
         next_level = levels[current_index + 1]
-        current_threshold = XPCalculator.LEVEL_THRESHOLDS[current_level]
-        next_threshold = XPCalculator.LEVEL_THRESHOLDS[next_level]
+        current_threshold = XPCalculator._THRESHOLDS[current_index]
+        next_threshold = XPCalculator._THRESHOLDS[current_index + 1]
         
         xp_in_level = current_xp - current_threshold
         xp_for_level = next_threshold - current_threshold
@@ -145,7 +160,8 @@ class XPCalculator:
         if last_activity_date is None:
             return 1, True
         
-        days_diff = (current_date - last_activity_date).days
+        # Ordinal day numbers avoid building a timedelta
+        days_diff = current_date.toordinal() - last_activity_date.toordinal()
         
         if days_diff == 0:
             # Same day, streak unchanged
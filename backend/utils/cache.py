@@ -0,0 +1,38 @@
+"""
+In-process TTL caches for read-heavy progress endpoints and per-user services
+"""
+from cachetools import TTLCache
+
+# Keyed by user_id. Entries expire on their own and are dropped early by
+# invalidate_user() once a write that changes them has committed (lesson,
+# review and placement submits, speaking XP, vocabulary and profile edits).
+dashboard_cache = TTLCache(maxsize=10_000, ttl=30)
+achievements_cache = TTLCache(maxsize=10_000, ttl=60)
+skill_badges_cache = TTLCache(maxsize=10_000, ttl=30)
+
+# Rendered PDF reports, keyed by (user_id, report inputs) so changed stats miss
+report_cache = TTLCache(maxsize=512, ttl=600)
+
+# Configured SpeechService per user_id (saves the settings query and key
+# decryption on every speaking turn); dropped when the user's AI settings change
+speech_service_cache = TTLCache(maxsize=10_000, ttl=300)
+
+# Verified JWT payloads keyed by a digest of the token, so a session's repeat
+# requests skip the signature check; expiry is still checked on every hit
+token_cache = TTLCache(maxsize=10_000, ttl=60)
+
+# Gemini grammar explanations keyed by (normalised grammar point, CEFR level);
+# the call is low-temperature, so the same question gets the same answer
+grammar_explanation_cache = TTLCache(maxsize=1024, ttl=86400)
+
+
+def invalidate_user(user_id: int):
+    """Drop all cached progress responses for a user"""
+    dashboard_cache.pop(user_id, None)
+    achievements_cache.pop(user_id, None)
+    skill_badges_cache.pop(user_id, None)
+
+
+def invalidate_speech_service(user_id: int):
+    """Drop the cached speech service after a user's API keys or provider change"""
+    speech_service_cache.pop(user_id, None)
@@ -2,22 +2,76 @@
 Encryption utilities for sensitive data (API keys)
 """
 import base64
+import hashlib
+import hmac
+import os
+from functools import lru_cache
 from cryptography.fernet import Fernet
 from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 from config import settings
 
+# Prefix for AES-GCM values under the HKDF-derived key. "v2:" values use the
+# older PBKDF2-derived key; anything without a prefix is a legacy Fernet token
+_AESGCM_PREFIX = "v3:"
+_LEGACY_AESGCM_PREFIX = "v2:"
+_NONCE_SIZE = 12
+_SALT = b'lingualearn_salt'  # In production, use a random salt stored securely
 
-def _get_fernet():
-    """Get Fernet instance with derived key"""
-    # Derive a key from the encryption key
+# Built on first use so the key derivation and key schedule run once per process
+_aesgcm = None
+
+# Separate HMAC key for fingerprints so they reveal nothing about the cipher key
+_FINGERPRINT_KEY = hashlib.sha256(b"api-key-fingerprint:" + settings.ENCRYPTION_KEY.encode()).digest()
+
+
+def _derive_key() -> bytes:
+    """
+    Derive the 32-byte key from the configured encryption key.
+    ENCRYPTION_KEY is a random secret, not a password, so a single HKDF
+    expansion is enough - there is nothing for key stretching to protect.
+    """
+    kdf = HKDF(
+        algorithm=hashes.SHA256(),
+        length=32,
+        salt=_SALT,
+        info=b'fluentai-api-key-v1',
+    )
+    return kdf.derive(settings.ENCRYPTION_KEY.encode())
+
+
+@lru_cache(maxsize=1)
+def _derive_legacy_key() -> bytes:
+    """PBKDF2-derived key used by "v2:" and Fernet values (once per process)"""
     kdf = PBKDF2HMAC(
         algorithm=hashes.SHA256(),
         length=32,
-        salt=b'lingualearn_salt',  # In production, use a random salt stored securely
+        salt=_SALT,
         iterations=100000,
     )
-    key = base64.urlsafe_b64encode(kdf.derive(settings.ENCRYPTION_KEY.encode()))
+    return kdf.derive(settings.ENCRYPTION_KEY.encode())
+
+
+def _get_aesgcm() -> AESGCM:
+    """Get the shared AES-GCM cipher (OpenSSL EVP, uses AES-NI where available)"""
+    global _aesgcm
+    if _aesgcm is None:
+        _aesgcm = AESGCM(_derive_key())
+    return _aesgcm
+
+
+@lru_cache(maxsize=1)
+def _get_legacy_aesgcm() -> AESGCM:
+    """AES-GCM cipher for "v2:" values written before the switch to HKDF"""
+    return AESGCM(_derive_legacy_key())
+
+
+@lru_cache(maxsize=1)
+def _get_fernet():
+    """Get the shared Fernet instance with derived key (only needed to read legacy values)"""
+    key = base64.urlsafe_b64encode(_derive_legacy_key())
     return Fernet(key)
 
 
@@ -26,9 +80,9 @@ def encrypt_api_key(api_key: str) -> str:
     if not api_key:
         return ""
     
-    fernet = _get_fernet()
-    encrypted = fernet.encrypt(api_key.encode())
-    return base64.urlsafe_b64encode(encrypted).decode()
+    nonce = os.urandom(_NONCE_SIZE)
+    encrypted = _get_aesgcm().encrypt(nonce, api_key.encode(), None)
+    return _AESGCM_PREFIX + base64.urlsafe_b64encode(nonce + encrypted).decode()
 
 
 def decrypt_api_key(encrypted_key: str) -> str:
@@ -37,6 +91,17 @@ def decrypt_api_key(encrypted_key: str) -> str:
         return ""
     
     try:
+        if encrypted_key.startswith(_AESGCM_PREFIX):
+            data = base64.urlsafe_b64decode(encrypted_key[len(_AESGCM_PREFIX):].encode())
+            decrypted = _get_aesgcm().decrypt(data[:_NONCE_SIZE], data[_NONCE_SIZE:], None)
+            return decrypted.decode()
+        
+        if encrypted_key.startswith(_LEGACY_AESGCM_PREFIX):
+            data = base64.urlsafe_b64decode(encrypted_key[len(_LEGACY_AESGCM_PREFIX):].encode())
+            decrypted = _get_legacy_aesgcm().decrypt(data[:_NONCE_SIZE], data[_NONCE_SIZE:], None)
+            return decrypted.decode()
+        
+        # Stored before the switch to AES-GCM
         fernet = _get_fernet()
         encrypted_bytes = base64.urlsafe_b64decode(encrypted_key.encode())
         decrypted = fernet.decrypt(encrypted_bytes)
@@ -45,6 +110,11 @@ def decrypt_api_key(encrypted_key: str) -> str:
         return ""
 
 
+def fingerprint_api_key(api_key: str) -> str:
+    """Keyed fingerprint of an API key, to recognise a resubmitted key without decrypting"""
+    return hmac.new(_FINGERPRINT_KEY, api_key.encode(), hashlib.sha256).hexdigest()
+
+
 def mask_api_key(api_key: str) -> str:
     """Mask API key for display (show only last 4 characters)"""
     if not api_key or len(api_key) < 8:
@@ -3,11 +3,14 @@ JWT Token Handler
 """
 from datetime import datetime, timedelta
 from typing import Optional
+import hashlib
+import time
 from jose import JWTError, jwt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 
 from config import settings
+from utils.cache import token_cache
 
 security = HTTPBearer()
 
@@ -30,41 +33,69 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     return encoded_jwt
 
 
+def refresh_access_token(current_user: dict, **claims) -> str:
+    """Re-mint the caller's token, overriding the given claims (e.g. after a level change)"""
+    data = {
+        "sub": str(current_user["user_id"]),
+        "email": current_user["email"],
+        "role": current_user["role"],
+        "cefr_level": current_user.get("cefr_level")
+    }
+    data.update(claims)
+    return create_access_token(data)
+
+
 def verify_token(token: str) -> Optional[dict]:
     """Verify and decode a JWT token"""
+    key = hashlib.blake2b(token.encode(), digest_size=16).digest()
+    payload = token_cache.get(key)
+    if payload is not None and payload["exp"] > time.time():
+        return payload
+    
     try:
         payload = jwt.decode(
             token, 
             settings.JWT_SECRET_KEY, 
             algorithms=[settings.JWT_ALGORITHM]
         )
-        return payload
     except JWTError:
         return None
+    if "exp" in payload:
+        token_cache[key] = payload
+    return payload
 
 
-async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> dict:
-    """Get the current authenticated user from the token"""
-    credentials_exception = HTTPException(
+def _credentials_exception() -> HTTPException:
+    """401 raised for a missing or invalid token"""
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    
+
+
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> dict:
+    """
+    Get the current authenticated user from the token.
+    Only depends on the bearer credentials, so FastAPI's per-request
+    dependency cache resolves it once per request - get_admin_user and any
+    other sub-dependency share the same decoded user.
+    """
     token = credentials.credentials
     payload = verify_token(token)
     
     if payload is None:
-        raise credentials_exception
+        raise _credentials_exception()
     
     user_id = payload.get("sub")
     if user_id is None:
-        raise credentials_exception
+        raise _credentials_exception()
     
     return {
         "user_id": int(user_id),
         "email": payload.get("email"),
-        "role": payload.get("role", "student")
+        "role": payload.get("role", "student"),
+        "cefr_level": payload.get("cefr_level")
     }
 
 
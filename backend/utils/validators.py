@@ -2,13 +2,33 @@
 Input Validators
 """
 import re
+import string
 from typing import Tuple
 
+# Compiled once at import; these run on every signup, login and profile update
+_LETTER_RE = re.compile(r'[A-Za-z]')
+_DIGIT_RE = re.compile(r'\d')
+_HTML_RE = re.compile(r'<[^>]+>')
+
+# Allowed characters for validate_email's single-pass scan
+_EMAIL_LOCAL_CHARS = frozenset(string.ascii_letters + string.digits + "._%+-")
+_EMAIL_DOMAIN_CHARS = frozenset(string.ascii_letters + string.digits + ".-")
+_EMAIL_TLD_CHARS = frozenset(string.ascii_letters)
+
 
 def validate_email(email: str) -> Tuple[bool, str]:
-    """Validate email format"""
-    pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-    if re.match(pattern, email):
+    """
+    Validate email format: local@domain.tld, where the TLD is at least two
+    letters (same rules as ^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\\.[a-zA-Z]{2,}$)
+    """
+    local, at, domain = email.partition("@")
+    dot = domain.rfind(".")
+    if (
+        at and local and dot > 0 and len(domain) - dot > 2
+        and _EMAIL_LOCAL_CHARS.issuperset(local)
+        and _EMAIL_DOMAIN_CHARS.issuperset(domain[:dot])
+        and _EMAIL_TLD_CHARS.issuperset(domain[dot + 1:])
+    ):
         return True, ""
     return False, "Invalid email format"
 
@@ -23,10 +43,10 @@ def validate_password(password: str) -> Tuple[bool, str]:
     if len(password) < 6:
         return False, "Password must be at least 6 characters long"
     
-    if not re.search(r'[A-Za-z]', password):
+    if not _LETTER_RE.search(password):
         return False, "Password must contain at least one letter"
     
-    if not re.search(r'\d', password):
+    if not _DIGIT_RE.search(password):
         return False, "Password must contain at least one number"
     
     return True, ""
@@ -40,8 +60,14 @@ def validate_cefr_level(level: str) -> bool:
 
 def sanitize_string(text: str) -> str:
     """Basic string sanitization"""
-    # Remove any HTML tags
-    clean = re.sub(r'<[^>]+>', '', text)
-    # Remove multiple spaces
-    clean = re.sub(r'\s+', ' ', clean)
-    return clean.strip()
+    # Remove any HTML tags (skip the regex pass when there can be none).
+    # No tag can end after the last '>', so only the text up to it is searched:
+    # each '<' there reaches a '>', whereas on the full text every '<' without
+    # one rescans to the end (quadratic on input like '<' * n).
+    if '<' in text:
+        cut = text.rfind('>') + 1
+        clean = _HTML_RE.sub('', text[:cut]) + text[cut:]
+    else:
+        clean = text
+    # Collapse whitespace runs and trim in one pass
+    return ' '.join(clean.split())
@@ -0,0 +1,18 @@
+-- FluentAI Migration 001
+-- Composite indexes for per-user dashboard queries.
+-- Fresh installs get these from schema.sql; run once on existing databases.
+
+USE fluentai;
+
+ALTER TABLE user_progress
+    ADD INDEX idx_user_completed (user_id, completed_at),
+    ADD INDEX idx_user_lesson (user_id, lesson_id);
+
+ALTER TABLE vocabulary_lists
+    ADD INDEX idx_user_mastered (user_id, mastered);
+
+ALTER TABLE achievements
+    ADD INDEX idx_user_earned (user_id, earned_at DESC);
+
+ALTER TABLE user_mistakes
+    ADD INDEX idx_user_created (user_id, created_at DESC);
@@ -0,0 +1,38 @@
+-- FluentAI Migration 002
+-- Per-user pending mistake counter so /api/review/generate can skip the
+-- user_mistakes scan for users with nothing to review.
+-- Kept in sync by triggers; ON DUPLICATE KEY UPDATE re-inserts fire the
+-- UPDATE trigger (none here), so only genuinely new rows are counted.
+-- Safe to re-run, including on a database created from the current
+-- schema.sql (which already has the column and triggers).
+
+USE fluentai;
+
+SET @add_column = (
+    SELECT IF(COUNT(*) = 0,
+              'ALTER TABLE users ADD COLUMN pending_mistakes_count INT NOT NULL DEFAULT 0 AFTER longest_streak',
+              'DO 0')
+    FROM information_schema.COLUMNS
+    WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'users'
+      AND COLUMN_NAME = 'pending_mistakes_count'
+);
+PREPARE add_column FROM @add_column;
+EXECUTE add_column;
+DEALLOCATE PREPARE add_column;
+
+UPDATE users u
+SET pending_mistakes_count = (
+    SELECT COUNT(*) FROM user_mistakes m WHERE m.user_id = u.id
+);
+
+DROP TRIGGER IF EXISTS trg_user_mistakes_insert;
+CREATE TRIGGER trg_user_mistakes_insert AFTER INSERT ON user_mistakes
+FOR EACH ROW
+    UPDATE users SET pending_mistakes_count = pending_mistakes_count + 1
+    WHERE id = NEW.user_id;
+
+DROP TRIGGER IF EXISTS trg_user_mistakes_delete;
+CREATE TRIGGER trg_user_mistakes_delete AFTER DELETE ON user_mistakes
+FOR EACH ROW
+    UPDATE users SET pending_mistakes_count = GREATEST(pending_mistakes_count - 1, 0)
+    WHERE id = OLD.user_id;
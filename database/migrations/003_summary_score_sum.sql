@@ -0,0 +1,61 @@
+-- FluentAI Migration 003
+-- Per-user aggregate tables for the dashboard and progress report, plus the
+-- running score total the report uses to compute the average score without
+-- scanning user_progress.
+-- Databases from before these tables existed get them here; ones created
+-- from the current schema.sql already have them and are left unchanged.
+-- Every user then gets a summary row seeded from user_progress (rows from
+-- before score_sum existed are re-seeded), so the dashboard only reads it.
+
+USE fluentai;
+
+CREATE TABLE IF NOT EXISTS user_skill_stats (
+    user_id INT NOT NULL,
+    skill VARCHAR(32) NOT NULL,
+    total INT DEFAULT 0,
+    correct INT DEFAULT 0,
+    PRIMARY KEY (user_id, skill),
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+) ENGINE=InnoDB;
+
+CREATE TABLE IF NOT EXISTS user_dashboard_summary (
+    user_id INT PRIMARY KEY,
+    total_lessons INT DEFAULT 0,
+    today_date DATE DEFAULT NULL,
+    today_xp INT DEFAULT 0,
+    today_lessons INT DEFAULT 0,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+) ENGINE=InnoDB;
+
+SET @add_column = (
+    SELECT IF(COUNT(*) = 0,
+              'ALTER TABLE user_dashboard_summary ADD COLUMN score_sum INT DEFAULT NULL AFTER today_lessons',
+              'DO 0')
+    FROM information_schema.COLUMNS
+    WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'user_dashboard_summary'
+      AND COLUMN_NAME = 'score_sum'
+);
+PREPARE add_column FROM @add_column;
+EXECUTE add_column;
+DEALLOCATE PREPARE add_column;
+
+-- Rows that already have score_sum are kept; score_sum is assigned last
+-- because MySQL applies the SET list left to right
+INSERT INTO user_dashboard_summary
+    (user_id, total_lessons, today_date, today_xp, today_lessons, score_sum)
+SELECT u.id,
+       COUNT(p.id),
+       CURDATE(),
+       COALESCE(SUM(CASE WHEN p.completed_at >= CURDATE() THEN p.xp_earned ELSE 0 END), 0),
+       COALESCE(SUM(CASE WHEN p.completed_at >= CURDATE() THEN 1 ELSE 0 END), 0),
+       COALESCE(SUM(p.score), 0)
+FROM users u
+LEFT JOIN user_progress p ON p.user_id = u.id
+GROUP BY u.id
+ON DUPLICATE KEY UPDATE
+    total_lessons = IF(score_sum IS NULL, VALUES(total_lessons), total_lessons),
+    today_date = IF(score_sum IS NULL, VALUES(today_date), today_date),
+    today_xp = IF(score_sum IS NULL, VALUES(today_xp), today_xp),
+    today_lessons = IF(score_sum IS NULL, VALUES(today_lessons), today_lessons),
+    score_sum = COALESCE(score_sum, VALUES(score_sum));
@@ -0,0 +1,42 @@
+-- FluentAI Migration 004
+-- Per-user count of unmastered vocabulary so the dashboard does not have to
+-- COUNT(*) vocabulary_lists on every load. Kept in sync by triggers.
+-- Safe to re-run, including on a database created from the current schema.sql.
+
+USE fluentai;
+
+SET @add_column = (
+    SELECT IF(COUNT(*) = 0,
+              'ALTER TABLE users ADD COLUMN vocab_to_review_count INT NOT NULL DEFAULT 0 AFTER pending_mistakes_count',
+              'DO 0')
+    FROM information_schema.COLUMNS
+    WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'users'
+      AND COLUMN_NAME = 'vocab_to_review_count'
+);
+PREPARE add_column FROM @add_column;
+EXECUTE add_column;
+DEALLOCATE PREPARE add_column;
+
+UPDATE users u
+SET vocab_to_review_count = (
+    SELECT COUNT(*) FROM vocabulary_lists v
+    WHERE v.user_id = u.id AND v.mastered = FALSE
+);
+
+DROP TRIGGER IF EXISTS trg_vocabulary_lists_insert;
+CREATE TRIGGER trg_vocabulary_lists_insert AFTER INSERT ON vocabulary_lists
+FOR EACH ROW
+    UPDATE users SET vocab_to_review_count = vocab_to_review_count + (NOT NEW.mastered)
+    WHERE id = NEW.user_id;
+
+DROP TRIGGER IF EXISTS trg_vocabulary_lists_update;
+CREATE TRIGGER trg_vocabulary_lists_update AFTER UPDATE ON vocabulary_lists
+FOR EACH ROW
+    UPDATE users SET vocab_to_review_count = vocab_to_review_count + (NOT NEW.mastered) - (NOT OLD.mastered)
+    WHERE id = NEW.user_id;
+
+DROP TRIGGER IF EXISTS trg_vocabulary_lists_delete;
+CREATE TRIGGER trg_vocabulary_lists_delete AFTER DELETE ON vocabulary_lists
+FOR EACH ROW
+    UPDATE users SET vocab_to_review_count = GREATEST(vocab_to_review_count - (NOT OLD.mastered), 0)
+    WHERE id = OLD.user_id;
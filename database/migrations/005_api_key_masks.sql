@@ -0,0 +1,10 @@
+-- FluentAI Migration 005
+-- Store the masked display form of each API key next to the encrypted key so
+-- the profile page never has to decrypt. Existing keys are masked on the
+-- next profile read.
+
+USE fluentai;
+
+ALTER TABLE user_settings
+    ADD COLUMN openai_api_key_mask VARCHAR(16) DEFAULT NULL AFTER gemini_api_key,
+    ADD COLUMN gemini_api_key_mask VARCHAR(16) DEFAULT NULL AFTER openai_api_key_mask;
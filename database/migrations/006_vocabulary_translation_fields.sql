@@ -0,0 +1,33 @@
+-- FluentAI Migration 006
+-- Expose the fields of vocabulary_lists.translation (a JSON document stored
+-- as TEXT) as virtual generated columns so the vocabulary endpoints can
+-- select them directly instead of parsing the JSON in Python per row.
+-- Rows whose translation is not valid JSON read as NULL.
+
+USE fluentai;
+
+ALTER TABLE vocabulary_lists
+    ADD COLUMN meaning TEXT GENERATED ALWAYS AS (
+        IF(JSON_VALID(translation),
+           IF(JSON_TYPE(JSON_EXTRACT(translation, '$.meaning')) = 'NULL', NULL,
+              JSON_UNQUOTE(JSON_EXTRACT(translation, '$.meaning'))),
+           NULL)
+    ) VIRTUAL AFTER translation,
+    ADD COLUMN context TEXT GENERATED ALWAYS AS (
+        IF(JSON_VALID(translation),
+           IF(JSON_TYPE(JSON_EXTRACT(translation, '$.context')) = 'NULL', NULL,
+              JSON_UNQUOTE(JSON_EXTRACT(translation, '$.context'))),
+           NULL)
+    ) VIRTUAL AFTER meaning,
+    ADD COLUMN question TEXT GENERATED ALWAYS AS (
+        IF(JSON_VALID(translation),
+           IF(JSON_TYPE(JSON_EXTRACT(translation, '$.question')) = 'NULL', NULL,
+              JSON_UNQUOTE(JSON_EXTRACT(translation, '$.question'))),
+           NULL)
+    ) VIRTUAL AFTER context,
+    ADD COLUMN correct_answer TEXT GENERATED ALWAYS AS (
+        IF(JSON_VALID(translation),
+           IF(JSON_TYPE(JSON_EXTRACT(translation, '$.correct_answer')) = 'NULL', NULL,
+              JSON_UNQUOTE(JSON_EXTRACT(translation, '$.correct_answer'))),
+           NULL)
+    ) VIRTUAL AFTER question;
@@ -0,0 +1,11 @@
+-- FluentAI Migration 007
+-- The vocabulary advisor and practice queries filter on (user_id, mastered)
+-- and sort by mistake_count, created_at; index the whole sort so the LIMIT
+-- reads only the first rows. Supersedes idx_user_mastered (same prefix).
+-- achievements(user_id, badge_type) is already covered by unique_user_badge.
+
+USE fluentai;
+
+ALTER TABLE vocabulary_lists
+    ADD INDEX idx_vocab_user_active (user_id, mastered, mistake_count DESC, created_at DESC),
+    DROP INDEX idx_user_mastered;
@@ -0,0 +1,9 @@
+-- FluentAI Migration 008
+-- HMAC fingerprint of each stored API key so resubmitting the same key does
+-- not rewrite the row. Existing keys get a fingerprint on their next update.
+
+USE fluentai;
+
+ALTER TABLE user_settings
+    ADD COLUMN openai_api_key_fingerprint CHAR(64) DEFAULT NULL AFTER gemini_api_key_mask,
+    ADD COLUMN gemini_api_key_fingerprint CHAR(64) DEFAULT NULL AFTER openai_api_key_fingerprint;
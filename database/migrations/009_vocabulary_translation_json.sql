@@ -0,0 +1,13 @@
+-- FluentAI Migration 009
+-- vocabulary_lists.translation must hold valid JSON. Older rows with plain
+-- text are wrapped as {"meaning": <text>} (how the advisor used to read
+-- them), then a CHECK constraint keeps every future write valid.
+
+USE fluentai;
+
+UPDATE vocabulary_lists
+SET translation = JSON_OBJECT('meaning', translation)
+WHERE translation IS NOT NULL AND NOT JSON_VALID(translation);
+
+ALTER TABLE vocabulary_lists
+    ADD CONSTRAINT chk_translation_json CHECK (translation IS NULL OR JSON_VALID(translation));
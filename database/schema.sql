@@ -17,6 +17,8 @@ CREATE TABLE IF NOT EXISTS users (
     xp_total INT DEFAULT 0,
     current_streak INT DEFAULT 0,
     longest_streak INT DEFAULT 0,
+    pending_mistakes_count INT NOT NULL DEFAULT 0,
+    vocab_to_review_count INT NOT NULL DEFAULT 0,
     role ENUM('student', 'admin') DEFAULT 'student',
     created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
     last_login DATETIME DEFAULT NULL,
@@ -30,6 +32,10 @@ CREATE TABLE IF NOT EXISTS user_settings (
     user_id INT NOT NULL UNIQUE,
     openai_api_key TEXT DEFAULT NULL,
     gemini_api_key TEXT DEFAULT NULL,
+    openai_api_key_mask VARCHAR(16) DEFAULT NULL,
+    gemini_api_key_mask VARCHAR(16) DEFAULT NULL,
+    openai_api_key_fingerprint CHAR(64) DEFAULT NULL,
+    gemini_api_key_fingerprint CHAR(64) DEFAULT NULL,
     preferred_ai ENUM('openai', 'gemini') DEFAULT 'openai',
     notifications_enabled BOOLEAN DEFAULT TRUE,
     daily_goal_minutes INT DEFAULT 15,
@@ -101,24 +107,120 @@ CREATE TABLE IF NOT EXISTS user_progress (
     FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
     INDEX idx_user (user_id),
     INDEX idx_lesson (lesson_id),
-    INDEX idx_completed (completed_at)
+    INDEX idx_completed (completed_at),
+    INDEX idx_user_completed (user_id, completed_at),
+    INDEX idx_user_lesson (user_id, lesson_id)
 ) ENGINE=InnoDB;
 
+-- Per-user skill accuracy counters (updated on every graded submission)
+CREATE TABLE IF NOT EXISTS user_skill_stats (
+    user_id INT NOT NULL,
+    skill VARCHAR(32) NOT NULL,
+    total INT DEFAULT 0,
+    correct INT DEFAULT 0,
+    PRIMARY KEY (user_id, skill),
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+) ENGINE=InnoDB;
+
+-- Per-user dashboard aggregates (updated on every progress insert)
+CREATE TABLE IF NOT EXISTS user_dashboard_summary (
+    user_id INT PRIMARY KEY,
+    total_lessons INT DEFAULT 0,
+    today_date DATE DEFAULT NULL,
+    today_xp INT DEFAULT 0,
+    today_lessons INT DEFAULT 0,
+    score_sum INT DEFAULT NULL,  -- NULL only on rows from before migration 003
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+) ENGINE=InnoDB;
+
+-- Questions answered wrong and not yet reviewed correctly (review mode)
+CREATE TABLE IF NOT EXISTS user_mistakes (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    user_id INT NOT NULL,
+    question_id INT NOT NULL,
+    source_type VARCHAR(32) DEFAULT NULL,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+    UNIQUE KEY unique_user_question (user_id, question_id),
+    INDEX idx_user_created (user_id, created_at DESC)
+) ENGINE=InnoDB;
+
+-- Keep users.pending_mistakes_count in sync; ON DUPLICATE KEY UPDATE
+-- re-inserts fire no INSERT trigger, so only new mistakes are counted
+DROP TRIGGER IF EXISTS trg_user_mistakes_insert;
+CREATE TRIGGER trg_user_mistakes_insert AFTER INSERT ON user_mistakes
+FOR EACH ROW
+    UPDATE users SET pending_mistakes_count = pending_mistakes_count + 1
+    WHERE id = NEW.user_id;
+
+DROP TRIGGER IF EXISTS trg_user_mistakes_delete;
+CREATE TRIGGER trg_user_mistakes_delete AFTER DELETE ON user_mistakes
+FOR EACH ROW
+    UPDATE users SET pending_mistakes_count = GREATEST(pending_mistakes_count - 1, 0)
+    WHERE id = OLD.user_id;
+
 -- Vocabulary lists (for review)
 CREATE TABLE IF NOT EXISTS vocabulary_lists (
     id INT AUTO_INCREMENT PRIMARY KEY,
     user_id INT NOT NULL,
     word VARCHAR(100) NOT NULL,
     translation TEXT,
+    -- Fields of the translation JSON, extracted by the server on read
+    meaning TEXT GENERATED ALWAYS AS (
+        IF(JSON_VALID(translation),
+           IF(JSON_TYPE(JSON_EXTRACT(translation, '$.meaning')) = 'NULL', NULL,
+              JSON_UNQUOTE(JSON_EXTRACT(translation, '$.meaning'))),
+           NULL)
+    ) VIRTUAL,
+    context TEXT GENERATED ALWAYS AS (
+        IF(JSON_VALID(translation),
+           IF(JSON_TYPE(JSON_EXTRACT(translation, '$.context')) = 'NULL', NULL,
+              JSON_UNQUOTE(JSON_EXTRACT(translation, '$.context'))),
+           NULL)
+    ) VIRTUAL,
+    question TEXT GENERATED ALWAYS AS (
+        IF(JSON_VALID(translation),
+           IF(JSON_TYPE(JSON_EXTRACT(translation, '$.question')) = 'NULL', NULL,
+              JSON_UNQUOTE(JSON_EXTRACT(translation, '$.question'))),
+           NULL)
+    ) VIRTUAL,
+    correct_answer TEXT GENERATED ALWAYS AS (
+        IF(JSON_VALID(translation),
+           IF(JSON_TYPE(JSON_EXTRACT(translation, '$.correct_answer')) = 'NULL', NULL,
+              JSON_UNQUOTE(JSON_EXTRACT(translation, '$.correct_answer'))),
+           NULL)
+    ) VIRTUAL,
     mistake_count INT DEFAULT 0,
     mastered BOOLEAN DEFAULT FALSE,
     created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
     FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
     UNIQUE KEY unique_user_word (user_id, word),
     INDEX idx_user (user_id),
-    INDEX idx_mastered (mastered)
+    INDEX idx_mastered (mastered),
+    INDEX idx_vocab_user_active (user_id, mastered, mistake_count DESC, created_at DESC),
+    CONSTRAINT chk_translation_json CHECK (translation IS NULL OR JSON_VALID(translation))
 ) ENGINE=InnoDB;
 
+-- Keep users.vocab_to_review_count (unmastered words) in sync
+DROP TRIGGER IF EXISTS trg_vocabulary_lists_insert;
+CREATE TRIGGER trg_vocabulary_lists_insert AFTER INSERT ON vocabulary_lists
+FOR EACH ROW
+    UPDATE users SET vocab_to_review_count = vocab_to_review_count + (NOT NEW.mastered)
+    WHERE id = NEW.user_id;
+
+DROP TRIGGER IF EXISTS trg_vocabulary_lists_update;
+CREATE TRIGGER trg_vocabulary_lists_update AFTER UPDATE ON vocabulary_lists
+FOR EACH ROW
+    UPDATE users SET vocab_to_review_count = vocab_to_review_count + (NOT NEW.mastered) - (NOT OLD.mastered)
+    WHERE id = NEW.user_id;
+
+DROP TRIGGER IF EXISTS trg_vocabulary_lists_delete;
+CREATE TRIGGER trg_vocabulary_lists_delete AFTER DELETE ON vocabulary_lists
+FOR EACH ROW
+    UPDATE users SET vocab_to_review_count = GREATEST(vocab_to_review_count - (NOT OLD.mastered), 0)
+    WHERE id = OLD.user_id;
+
 -- Achievements/Badges
 CREATE TABLE IF NOT EXISTS achievements (
     id INT AUTO_INCREMENT PRIMARY KEY,
@@ -127,7 +229,8 @@ CREATE TABLE IF NOT EXISTS achievements (
     earned_at DATETIME DEFAULT CURRENT_TIMESTAMP,
     FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
     UNIQUE KEY unique_user_badge (user_id, badge_type),
-    INDEX idx_user (user_id)
+    INDEX idx_user (user_id),
+    INDEX idx_user_earned (user_id, earned_at DESC)
 ) ENGINE=InnoDB;
 
 -- Conversation history (for AI speaking sessions)
@@ -154,6 +257,11 @@ INSERT INTO user_settings (user_id, notifications_enabled, daily_goal_minutes)
 SELECT id, TRUE, 15 FROM users WHERE email = 'admin@lingualearn.com'
 ON DUPLICATE KEY UPDATE notifications_enabled = TRUE;
 
+-- Insert admin dashboard summary (no progress yet)
+INSERT INTO user_dashboard_summary (user_id, total_lessons, today_date, today_xp, today_lessons, score_sum)
+SELECT id, 0, CURDATE(), 0, 0, 0 FROM users WHERE email = 'admin@lingualearn.com'
+ON DUPLICATE KEY UPDATE user_id = user_id;
+
 -- Insert sample lesson packs
 INSERT INTO lesson_packs (title, description, cefr_level, order_index, icon) VALUES
 ('Basics 1', 'Start your English journey with fundamental vocabulary', 'A1', 1, '🌱'),
@@ -110,10 +110,12 @@ class APIClient {
     }
 
     async submitPlacementTest(answers) {
-        return this.request('/assessment/submit', {
+        const result = await this.request('/assessment/submit', {
             method: 'POST',
             body: JSON.stringify(answers),
         });
+        if (result.access_token) this.setToken(result.access_token);
+        return result;
     }
 
     async getTransitionTest(level) {
@@ -150,7 +152,7 @@ class APIClient {
     }
 
     async submitLesson(lessonId, answers, totalTime) {
-        return this.request(`/lessons/${lessonId}/submit`, {
+        const result = await this.request(`/lessons/${lessonId}/submit`, {
             method: 'POST',
             body: JSON.stringify({
                 lesson_id: lessonId,
@@ -158,6 +160,8 @@ class APIClient {
                 total_time_seconds: totalTime,
             }),
         });
+        if (result.access_token) this.setToken(result.access_token);
+        return result;
     }
 
     // Speaking endpoints